@@ -20,6 +20,7 @@ class ConfigManager:
     _observer = None
     _debounce_timer = None
     _debounce_delay = 1.0  # seconds
+    _listeners = []
 
     def __new__(cls):
         if cls._instance is None:
@@ -72,6 +73,10 @@ class ConfigManager:
         logger.info(f"使用配置文件: {config_file}")
         return config_file
 
+    def add_listener(self, listener):
+        """注册配置重新加载后的回调 listener(config)"""
+        self._listeners.append(listener)
+
     def _load_config(self):
         """加载配置文件"""
         try:
@@ -92,6 +97,9 @@ class ConfigManager:
             logger.error(f"加载配置文件失败: {e}")
             raise
 
+        for listener in list(self._listeners):
+            listener(self.get_all())
+
     def _deep_merge(self, base: Dict, override: Dict) -> Dict:
         """深度合并两个字典"""
         result = base.copy()
@@ -124,6 +132,20 @@ class ConfigManager:
         self._observer.start()
         logger.info("配置文件监视器已启动")
 
+    def restart_file_watcher(self):
+        """重新启动文件监视器（fork 后子进程中监视线程不会保留）"""
+        self._setup_file_watcher()
+
+    def stop_file_watcher(self):
+        """停止文件监视器及尚未触发的延迟重载"""
+        if self._debounce_timer:
+            self._debounce_timer.cancel()
+            self._debounce_timer = None
+        if self._observer is not None and self._observer.is_alive():
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            logger.info("配置文件监视器已停止")
+
     def _debounced_reload(self):
         """Debounced reload of configuration"""
         if self._debounce_timer:
@@ -0,0 +1,228 @@
+"""
+日志子系统
+
+进程内只配置一次（setup_logging），由 settings.LOGGING 驱动:
+- 调用方线程（事件循环）只做截断和入队，格式化与写 stderr 由后台 QueueListener 线程完成；
+  队列满时直接丢弃并计数，绝不阻塞事件循环
+- 按 logger 名称的令牌桶限流与采样，WARNING 及以上级别不受影响
+- 通过 extra={...} 传入的字段作为结构化字段输出（文本格式追加 key=value，json 格式为独立字段）
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from typing import Dict, Optional
+from config.settings import settings
+
+# LogRecord 自带的属性，其余属性视为 extra 结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["_NonBlockingQueueHandler"] = None
+_lock = threading.Lock()
+_fork_hook_registered = False
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+class StructuredFormatter(logging.Formatter):
+    """文本格式：在配置的 format 之后追加 extra 字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志一行 JSON，便于日志系统采集"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按 logger 名称限流与采样（仅作用于 WARNING 以下级别）
+
+    rate_limits 形如 {"routers.ws": {"rate": 20, "burst": 50, "sample": 0.5}}，
+    logger 名称按前缀匹配最长的配置项。被丢弃的条数在下一条放行的日志中以 suppressed 字段报告。
+    """
+
+    def __init__(self, rate_limits: Dict[str, Dict]):
+        super().__init__()
+        self.rules = {name: dict(rule) for name, rule in (rate_limits or {}).items()}
+        self._buckets: Dict[str, list] = {}  # rule 名称 -> [tokens, last_refill, suppressed]
+        self._resolved: Dict[str, Optional[str]] = {}
+
+    def _rule_for(self, logger_name: str) -> Optional[str]:
+        if logger_name not in self._resolved:
+            matches = [name for name in self.rules
+                       if logger_name == name or logger_name.startswith(name + ".")]
+            self._resolved[logger_name] = max(matches, key=len) if matches else None
+        return self._resolved[logger_name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        name = self._rule_for(record.name)
+        if name is None:
+            return True
+        rule = self.rules[name]
+        bucket = self._buckets.get(name)
+        now = time.monotonic()
+        if bucket is None:
+            bucket = self._buckets[name] = [float(rule.get("burst", rule.get("rate", 0))), now, 0]
+
+        sample = float(rule.get("sample", 1.0))
+        if sample < 1.0 and random.random() >= sample:
+            bucket[2] += 1
+            return False
+
+        rate = float(rule.get("rate", 0))
+        if rate > 0:
+            burst = float(rule.get("burst", rate))
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """入队前只做消息求值与截断；队列满时丢弃而不是阻塞或报错"""
+
+    def __init__(self, log_queue: queue.Queue, max_length: int):
+        super().__init__(log_queue)
+        self.max_length = max_length
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = _truncate(record.getMessage(), self.max_length)
+        record.args = None
+        if record.exc_info:
+            # traceback 对象不能跨线程延后格式化
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_output_handler(config: Dict) -> logging.Handler:
+    handler = logging.StreamHandler(sys.stderr)
+    fmt = config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s").strip()
+    if settings.LOG_STRUCTURED:
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(StructuredFormatter(fmt))
+    return handler
+
+
+def _start(config: Dict):
+    global _listener, _queue_handler
+    log_queue: queue.Queue = queue.Queue(maxsize=int(config.get("queue_size", 10000)))
+    _queue_handler = _NonBlockingQueueHandler(log_queue, int(config.get("max_message_length", 500)))
+    _queue_handler.addFilter(RateLimitFilter(config.get("rate_limits", {})))
+    _listener = logging.handlers.QueueListener(log_queue, _build_output_handler(config))
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    _apply_levels(settings.LOG_LEVEL, config)
+
+
+def _apply_levels(level: str, config: Dict):
+    logging.getLogger().setLevel(str(level).upper())
+    for name, logger_level in (config.get("levels") or {}).items():
+        logging.getLogger(name).setLevel(str(logger_level).upper())
+
+
+def _on_settings_change(new, old):
+    """热加载：级别、限流规则与截断长度立即生效（格式与队列长度需重启）"""
+    if new.LOGGING == old.LOGGING and new.LOG_LEVEL == old.LOG_LEVEL:
+        return
+    _apply_levels(new.LOG_LEVEL, new.LOGGING)
+    if _queue_handler is not None:
+        _queue_handler.max_length = int(new.LOGGING.get("max_message_length", 500))
+        _queue_handler.filters = [RateLimitFilter(new.LOGGING.get("rate_limits", {}))]
+
+
+def _restart_in_child():
+    """fork 后后台监听线程不会被继承，子进程需要重建队列与监听线程"""
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    _start(settings.LOGGING)
+
+
+def setup_logging():
+    """按 settings.LOGGING 配置日志，重复调用无副作用"""
+    global _fork_hook_registered
+    with _lock:
+        if _listener is not None:
+            return
+        _start(settings.LOGGING)
+        if not _fork_hook_registered:
+            settings.subscribe(_on_settings_change)
+            atexit.register(shutdown_logging)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=_restart_in_child)
+            _fork_hook_registered = True
+
+
+def shutdown_logging():
+    """停止后台监听线程并写出队列中剩余的日志"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        # 之后的日志（如退出阶段）直接同步输出，避免写入无人消费的队列
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        for handler in _listener.handlers:
+            root.addHandler(handler)
+        _listener = None
+        if _queue_handler.dropped:
+            sys.stderr.write(f"logging: dropped {_queue_handler.dropped} records (queue full)\n")
@@ -1,13 +1,52 @@
 import os
+import copy
+import logging
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional
 from .config_manager import ConfigManager
 
+logger = logging.getLogger(__name__)
+
 # 获取配置管理器实例
 config_manager = ConfigManager()
 
+# 只在重启时生效的配置项（模型、进程结构、监听地址等），热加载时保留旧值并给出警告
+RESTART_ONLY_KEYS = (
+    "asr.model",
+    "asr.model_dir",
+    "asr.vad_model",
+    "asr.vad_params",
+    "asr.device",
+    "asr.audio",
+    "asr.inference.processes",
+    "asr.inference.start_method",
+    "asr.inference.ring_slots",
+    "asr.inference.slot_seconds",
+    "server",
+    "session_store",
+    "metrics",
+    "tracing.export_file",
+    "debug.loop_lag.enabled",
+)
+
+
+def _freeze(value: Any) -> Any:
+    """递归转换为只读结构（dict -> MappingProxyType，list -> tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
 class Settings:
-    def __init__(self):
-        config = config_manager.get_all()
+    """不可变的配置快照，每次热加载生成新的版本"""
+
+    def __init__(self, config: Optional[Dict] = None, version: int = 1):
+        config = copy.deepcopy(config if config is not None else config_manager.get_all())
+        self.VERSION = version
 
         # TTS设置（包含Edge TTS设置）
         tts = config['tts']
@@ -18,6 +57,14 @@ class Settings:
         self.TTS_VOICES = tts['voices']
         self.TTS_CACHE_DIR = tts['temp_dir']
         self.TTS_CLEANUP_MAX_AGE = tts['cleanup']['max_age_hours']
+        self.TTS_ENDPOINT = os.getenv('TTS_ENDPOINT', tts.get('endpoint', '') or '')
+        tts_pool = tts.get('pool') or {}
+        self.TTS_POOL_SIZE = int(tts_pool.get('size', 4))
+        self.TTS_POOL_PREWARM = int(tts_pool.get('prewarm', 1))
+        self.TTS_POOL_MAX_IDLE = float(tts_pool.get('max_idle_s', 30))
+        self.TTS_POOL_MAX_REQUESTS = int(tts_pool.get('max_requests', 100))
+        self.TTS_CONNECT_TIMEOUT = float(tts_pool.get('connect_timeout_s', 10))
+        self.TTS_RECEIVE_TIMEOUT = float(tts_pool.get('receive_timeout_s', 60))
 
         # ASR设置
         asr = config['asr']
@@ -33,6 +80,16 @@ class Settings:
         self.ASR_AUDIO = asr['audio']
         self.ASR_VAD_MODEL = asr['vad_model']
         self.ASR_VAD_PARAMS = asr['vad_params']
+        self.ASR_EXECUTOR_WORKERS = int(asr.get('executor_workers', 1))
+        asr_batch = asr.get('batch', {})
+        self.ASR_BATCH_MAX_SIZE = int(asr_batch.get('max_size', 1))
+        self.ASR_BATCH_WINDOW_MS = float(asr_batch.get('window_ms', 0))
+        asr_inference = asr.get('inference', {})
+        self.ASR_INFERENCE_PROCESSES = int(os.getenv('ASR_INFERENCE_PROCESSES', asr_inference.get('processes', 0)))
+        self.ASR_INFERENCE_START_METHOD = asr_inference.get('start_method', 'spawn')
+        self.ASR_INFERENCE_RING_SLOTS = int(asr_inference.get('ring_slots', 8))
+        self.ASR_INFERENCE_SLOT_SECONDS = float(asr_inference.get('slot_seconds', 60))
+        self.ASR_INFERENCE_TIMEOUT = float(asr_inference.get('timeout', 120))
 
         # LLM设置
         llm = config['llm']
@@ -52,12 +109,22 @@ class Settings:
         # TTS设置
         self.TTS = tts  # 保存完整的TTS配置
 
+        # 静态资源设置
+        static = config.get('static') or {}
+        self.STATIC_INDEX = static.get('index', os.path.join('web', 'index.html'))
+        self.STATIC_CACHE_CONTROL = static.get('cache_control', 'no-cache')
+        self.STATIC_MIN_COMPRESS_BYTES = int(static.get('min_compress_bytes', 256))
+        self.STATIC_CHECK_INTERVAL = float(static.get('check_interval', 1.0))
+
         # 服务器设置
         server = config.get('server', {})
         self.SERVER = server  # 保存完整的服务器配置
         self.HOST = os.getenv('HOST', server.get('host', '0.0.0.0'))
         self.PORT = int(os.getenv('PORT', server.get('port', 8000)))
         self.DEBUG = os.getenv('DEBUG', str(server.get('debug', False))).lower() == 'true'
+        self.WORKERS = int(os.getenv('WORKERS', server.get('workers', 1)))
+        self.PREFORK = os.getenv('PREFORK', str(server.get('prefork', False))).lower() == 'true'
+        self.THREADS_PER_WORKER = int(os.getenv('THREADS_PER_WORKER', server.get('threads_per_worker', 0)))
 
         # WebSocket设置
         websocket = config.get('websocket', {})  # 添加默认值
@@ -65,12 +132,142 @@ class Settings:
         self.WS_PING_INTERVAL = int(os.getenv('WS_PING_INTERVAL', websocket.get('ping_interval', 20)))
         self.WS_PING_TIMEOUT = int(os.getenv('WS_PING_TIMEOUT', websocket.get('ping_timeout', 20)))
         self.WS_CLOSE_TIMEOUT = int(os.getenv('WS_CLOSE_TIMEOUT', websocket.get('close_timeout', 20)))
+        self.WS_MAX_SESSIONS = int(os.getenv('WS_MAX_SESSIONS', websocket.get('max_sessions', 200)))
+        self.WS_MAX_PENDING_TURNS = int(os.getenv('WS_MAX_PENDING_TURNS', websocket.get('max_pending_turns', 64)))
+        self.WS_IDLE_TIMEOUT = float(os.getenv('WS_IDLE_TIMEOUT', websocket.get('idle_timeout', 300)))
+        self.WS_REAP_INTERVAL = float(os.getenv('WS_REAP_INTERVAL', websocket.get('reap_interval', 10)))
+        self.WS_BUSY_CLOSE_CODE = int(websocket.get('busy_close_code', 1013))
+        self.WS_REAP_CLOSE_CODE = int(websocket.get('reap_close_code', 1001))
+        self.WS_DRAIN_TIMEOUT = float(os.getenv('WS_DRAIN_TIMEOUT', websocket.get('drain_timeout', 30)))
+        self.WS_RESTART_CLOSE_CODE = int(websocket.get('restart_close_code', 1012))
+
+        # 会话存储设置
+        session_store = config.get('session_store', {})
+        self.SESSION_STORE = session_store  # 保存完整的会话存储配置
+        self.SESSION_STORE_BACKEND = os.getenv('SESSION_STORE_BACKEND', session_store.get('backend', 'memory'))
+        self.SESSION_STORE_URL = os.getenv('SESSION_STORE_URL', session_store.get('url', 'redis://127.0.0.1:6379/0'))
+        self.SESSION_STORE_KEY_PREFIX = session_store.get('key_prefix', 'tiantian:session:')
+        self.SESSION_STORE_TTL = int(session_store.get('ttl', 3600))
+        self.SESSION_STORE_MAX_SESSIONS = int(session_store.get('max_sessions', 10000))
+
+        # 指标设置
+        metrics = config.get('metrics', {})
+        self.METRICS = metrics
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', str(metrics.get('enabled', True))).lower() == 'true'
+
+        # 追踪设置
+        tracing = config.get('tracing', {})
+        self.TRACING = tracing
+        self.TRACING_ENABLED = os.getenv('TRACING_ENABLED', str(tracing.get('enabled', True))).lower() == 'true'
+        self.TRACING_BUFFER_SIZE = int(tracing.get('buffer_size', 2048))
+        self.TRACING_EXPORT_FILE = os.getenv('TRACING_EXPORT_FILE', tracing.get('export_file', '') or '')
+
+        # HTTP 批量接口设置
+        api = config.get('api', {})
+        self.API = api
+        self.API_MAX_FILES = int(api.get('max_files', 32))
+        self.API_MAX_FILE_BYTES = int(float(api.get('max_file_mb', 20)) * 1024 * 1024)
+
+        # 调试与剖析设置
+        debug = config.get('debug', {})
+        loop_lag = debug.get('loop_lag', {})
+        self.DEBUG_CONFIG = debug
+        self.ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', debug.get('admin_token', '') or '')
+        self.LOOP_LAG_ENABLED = str(loop_lag.get('enabled', True)).lower() == 'true'
+        self.LOOP_LAG_INTERVAL = float(loop_lag.get('interval', 0.1))
+        self.LOOP_LAG_THRESHOLD = float(loop_lag.get('threshold', 0.2))
 
         # 日志设置
         logging_config = config['logging']
         self.LOGGING = logging_config  # 保存完整的日志配置
         self.LOG_LEVEL = os.getenv('LOG_LEVEL', logging_config['level'])
         self.LOG_FORMAT = logging_config['format']
+        self.LOG_STRUCTURED = os.getenv('LOG_STRUCTURED', str(logging_config.get('structured', False))).lower() == 'true'
+
+        for name, value in list(vars(self).items()):
+            object.__setattr__(self, name, _freeze(value))
+        object.__setattr__(self, "_frozen", True)
+
+    def __setattr__(self, name: str, value: Any):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"配置快照不可修改: {name}")
+        object.__setattr__(self, name, value)
+
+
+def _get_path(config: Dict, path: str) -> Any:
+    value = config
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _set_path(config: Dict, path: str, value: Any):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        config = config.setdefault(key, {})
+    if value is None:
+        config.pop(keys[-1], None)
+    else:
+        config[keys[-1]] = value
+
+
+class SettingsProvider:
+    """
+    对外暴露的 settings：属性访问转发到当前快照
+
+    配置文件变更后生成新的快照并通知订阅者 callback(new, old)。
+    订阅者在配置加载线程中被调用，只应做简单的属性替换；需要在事件循环中执行的操作自行调度。
+    """
+
+    def __init__(self):
+        self._raw = copy.deepcopy(config_manager.get_all())
+        self._snapshot = Settings(self._raw)
+        self._subscribers: List[Callable[[Settings, Settings], None]] = []
+        self._lock = threading.Lock()
+        config_manager.add_listener(self._on_reload)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._snapshot, name)
+
+    @property
+    def snapshot(self) -> Settings:
+        """当前配置快照；需要多个配置项保持一致时先取快照再读取"""
+        return self._snapshot
+
+    def subscribe(self, callback: Callable[[Settings, Settings], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Settings, Settings], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _on_reload(self, config: Dict):
+        with self._lock:
+            config = copy.deepcopy(config)
+            for path in RESTART_ONLY_KEYS:
+                old_value = _get_path(self._raw, path)
+                if _get_path(config, path) != old_value:
+                    logger.warning(f"配置项 {path} 需要重启服务才能生效，本次热加载忽略该变更")
+                    _set_path(config, path, copy.deepcopy(old_value))
+            if config == self._raw:
+                return
+            old = self._snapshot
+            try:
+                new = Settings(config, version=old.VERSION + 1)
+            except Exception as e:
+                logger.error(f"配置校验失败，继续使用版本 {old.VERSION}: {e}")
+                return
+            self._raw = config
+            self._snapshot = new
+            logger.info(f"配置已更新到版本 {new.VERSION}")
+
+        for callback in list(self._subscribers):
+            try:
+                callback(new, old)
+            except Exception as e:
+                logger.error(f"应用配置版本 {new.VERSION} 失败 ({getattr(callback, '__qualname__', callback)}): {e}")
 
 
-settings = Settings()
+settings = SettingsProvider()
@@ -11,3 +11,8 @@ class ASRError(Exception):
 class TTSError(Exception):
     """TTS服务相关错误"""
     pass
+
+
+class LLMError(Exception):
+    """LLM服务相关错误"""
+    pass
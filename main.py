@@ -1,14 +1,50 @@
-import os
+import logging
+import argparse
 import uvicorn
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import ws
-from config.settings import settings
+from config.settings import settings, config_manager
+from config.logging_setup import setup_logging, shutdown_logging
 
+# 日志需在导入各服务模块之前配置
+setup_logging()
 
-app = FastAPI()
+from routers import ws, debug, api
+from services import metrics
+from services.profiling import loop_monitor
+from services.health import health
+from services.tracing import tracer
+from services.lifecycle import DrainOnSignal
+from services.static_assets import index_page
+from prefork import run_prefork, configure_worker_threads, threads_per_worker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 事件循环延迟监控需要在工作进程自己的事件循环中启动
+    if settings.LOOP_LAG_ENABLED:
+        loop_monitor.start()
+    # 模型在后台加载，服务立即开始监听；就绪前 /health/ready 返回 503
+    ws.manager.startup()
+    # SIGTERM 时先排空会话再交给 uvicorn 关闭
+    DrainOnSignal(lambda: ws.manager.drain(settings.WS_DRAIN_TIMEOUT)).install()
+    try:
+        yield
+    finally:
+        # 未经 SIGTERM 的关闭（如 Ctrl+C）也走一遍排空，已排空时立即返回
+        await ws.manager.drain(settings.WS_DRAIN_TIMEOUT)
+        await ws.manager.shutdown()
+        if settings.LOOP_LAG_ENABLED:
+            await loop_monitor.stop()
+        config_manager.stop_file_watcher()
+        tracer.close()
+        shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 配置CORS
 app.add_middleware(
@@ -22,22 +58,68 @@ app.add_middleware(
 
 # 注册WebSocket路由
 app.include_router(ws.router)
+# 注册调试路由
+app.include_router(debug.router)
+# 注册 HTTP 批量接口路由
+app.include_router(api.router)
 
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root():
-    html_path = os.path.join("web", "index.html")
-    with open(html_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    return HTMLResponse(content=html_content, status_code=200)
+# 前端页面：预压缩后常驻内存，支持 ETag/304
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def read_root(request: Request):
+    return await index_page.respond(request)
 
 
-# 添加健康检查端点
+# 添加健康检查端点（兼容旧探针，等同于存活检查）
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 
+# 存活探针：进程与事件循环可以响应
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+# 就绪探针：模型加载并预热完成后才返回 200
+@app.get("/health/ready")
+async def readiness():
+    return JSONResponse(health.snapshot(), status_code=200 if health.ready else 503)
+
+
+# Prometheus 指标端点
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TianTian Server")
+    parser.add_argument("--host", default=settings.HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=int(settings.PORT), help="监听端口")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="uvicorn 工作进程数")
+    parser.add_argument("--prefork", action="store_true", default=settings.PREFORK,
+                        help="主进程加载模型后 fork 工作进程，共享模型内存")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    port = int(settings.PORT)
-    uvicorn.run(app, host=settings.HOST, port=port)
+    args = parse_args()
+    if args.workers > 1 and settings.SESSION_STORE_BACKEND == "memory":
+        logging.getLogger(__name__).warning(
+            "多工作进程下使用进程内会话存储，重连到其他进程时对话历史将丢失，"
+            "请将 session_store.backend 设置为 redis"
+        )
+    if args.prefork:
+        run_prefork(app, args.host, args.port, args.workers, settings.THREADS_PER_WORKER)
+    elif args.workers > 1:
+        configure_worker_threads(threads_per_worker(args.workers, settings.THREADS_PER_WORKER))
+        # 多进程模式需要以导入字符串的形式传入应用
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_config=None,
+                    timeout_graceful_shutdown=int(settings.WS_DRAIN_TIMEOUT))
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_config=None,
+                    timeout_graceful_shutdown=int(settings.WS_DRAIN_TIMEOUT))
@@ -0,0 +1,151 @@
+"""
+预加载（pre-fork）服务模式
+
+主进程导入应用并加载 ASR 模型、冻结权重，然后 fork 出工作进程共享同一个监听
+socket。模型权重所在的内存页在工作进程间以写时复制方式共享，内存不再随工作
+进程数线性增长。
+"""
+import gc
+import os
+import signal
+import socket
+import logging
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def threads_per_worker(workers: int, configured: int = 0) -> int:
+    """计算每个工作进程可用的推理线程数，避免多进程超额占用 CPU"""
+    if configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def configure_worker_threads(threads: int):
+    """设置当前进程（及其子进程）的 torch/ONNX 线程数"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    logger.info(f"Inference threads per worker: {threads}")
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, threads: int):
+    """工作进程入口，不会返回"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    exit_code = 0
+    try:
+        configure_worker_threads(threads)
+        from config.settings import config_manager
+        config_manager.restart_file_watcher()
+        from config.settings import settings
+        config = uvicorn.Config(app, log_config=None, timeout_graceful_shutdown=int(settings.WS_DRAIN_TIMEOUT))
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+        exit_code = 1
+    finally:
+        # os._exit 不会执行 atexit，需手动写出日志队列中剩余的记录
+        from config.logging_setup import shutdown_logging
+        shutdown_logging()
+        os._exit(exit_code)
+
+
+def run_prefork(app, host: str, port: int, workers: int, configured_threads: int = 0):
+    """在主进程加载模型后 fork 工作进程"""
+    from routers.ws import manager
+    from config.settings import settings
+
+    # 主进程只加载模型、不做推理：推理会启动 torch/OpenMP 线程池，fork 后工作进程继承的
+    # 线程池状态可能导致死锁。预热在各工作进程设置线程数后由后台加载任务完成（load 会直接跳过）；
+    # 使用独立推理进程时由各工作进程自行启动进程池
+    if manager.asr.inference_processes == 0:
+        manager.asr.load()
+    # 冻结权重并把当前对象移出 GC 扫描范围，避免工作进程中的引用计数/GC 写入导致共享页被复制
+    manager.asr.freeze()
+    gc.collect()
+    gc.freeze()
+
+    threads = threads_per_worker(workers, configured_threads)
+    sock = _bind_socket(host, port)
+    logger.info(f"Pre-fork master {os.getpid()} listening on {host}:{port}, spawning {workers} workers")
+
+    children: Dict[int, int] = {}
+    shutting_down = False
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, sock, threads)
+        children[pid] = slot
+        logger.info(f"Started worker {pid} (slot {slot})")
+
+    def kill_stragglers(signum, frame):
+        """排空与优雅关闭都超时后仍未退出的工作进程直接杀掉，避免残留半死进程"""
+        for pid in list(children):
+            logger.warning(f"Worker {pid} did not exit in time, killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def shutdown(signum, frame):
+        nonlocal shutting_down
+        if not shutting_down:
+            # 工作进程收到 SIGTERM 后先排空会话（最多 drain_timeout），再等待 HTTP 请求（同样的超时）；
+            # 再次收到信号时继续转发，工作进程会跳过剩余的排空等待
+            signal.signal(signal.SIGALRM, kill_stragglers)
+            signal.alarm(int(settings.WS_DRAIN_TIMEOUT) * 2 + 5)
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+        if not shutting_down:
+            spawn(slot)
+
+    sock.close()
+    logger.info("Pre-fork master exiting")
@@ -0,0 +1,189 @@
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import UploadFile
+from config.settings import settings
+from exceptions import FFmpegError, LLMError, TTSError
+from services.asr import INPUT_FORMATS
+from services.health import health, READY
+from services.llm import LLMService
+from routers.ws import manager, SESSION_ID_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# 创建路由对象
+router = APIRouter()
+
+# HTTP 接口的对话历史直接使用会话存储后端（不经过 WebSocket 连接状态）
+llm = LLMService(store=manager.session_store)
+
+NDJSON = "application/x-ndjson"
+
+
+def _ndjson(item) -> bytes:
+    return (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _require_ready(name: str):
+    status = health.services.get(name)
+    if status is None or status.state != READY:
+        raise HTTPException(status_code=503, detail=f"{name} not ready")
+
+
+async def _read_audio_files(request: Request) -> List[Tuple[str, bytes]]:
+    """读取上传的音频：multipart 表单中的所有文件，或整个请求体作为单个文件"""
+    content_type = request.headers.get("content-type", "")
+    files: List[Tuple[str, bytes]] = []
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form(max_files=settings.API_MAX_FILES + 1)
+        try:
+            for _, value in form.multi_items():
+                if isinstance(value, UploadFile):
+                    if len(files) >= settings.API_MAX_FILES:
+                        raise HTTPException(status_code=413, detail=f"too many files (max {settings.API_MAX_FILES})")
+                    data = await value.read(settings.API_MAX_FILE_BYTES + 1)
+                    files.append((value.filename or f"file{len(files)}", data))
+        finally:
+            await form.close()
+    else:
+        data = bytearray()
+        async for chunk in request.stream():
+            data += chunk
+            if len(data) > settings.API_MAX_FILE_BYTES:
+                break
+        if data:
+            files.append(("body", bytes(data)))
+
+    if not files:
+        raise HTTPException(status_code=400, detail="no audio uploaded")
+    for filename, data in files:
+        if len(data) > settings.API_MAX_FILE_BYTES:
+            raise HTTPException(status_code=413, detail=f"{filename} exceeds {settings.API_MAX_FILE_BYTES} bytes")
+    return files
+
+
+async def _transcribe_one(index: int, filename: str, audio: bytes, input_format: str) -> dict:
+    start = time.perf_counter()
+    try:
+        pcm = await manager.asr.decode(audio, input_format)
+        text = await manager.asr.recognize_pcm(pcm) if pcm else ""
+        return {
+            "index": index,
+            "filename": filename,
+            "text": text,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+    except FFmpegError as e:
+        return {"index": index, "filename": filename, "error": f"音频处理失败: {str(e)}"}
+    except Exception as e:
+        logger.error(f"Batch transcription failed for {filename}: {str(e)}")
+        return {"index": index, "filename": filename, "error": f"语音识别失败: {str(e)}"}
+
+
+@router.post("/asr")
+async def transcribe(request: Request, format: str = Query("auto")):
+    """
+    批量语音识别：multipart 上传多个文件或直接上传单个音频体。
+    各文件并发解码，识别请求由 ASR 批处理合并；结果按完成顺序以 NDJSON 逐行返回。
+    """
+    if format not in INPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported format: {format}")
+    _require_ready("asr")
+    files = await _read_audio_files(request)
+    logger.info(f"ASR batch request: {len(files)} files, format={format}")
+
+    async def results() -> AsyncIterator[bytes]:
+        tasks = [
+            asyncio.create_task(_transcribe_one(index, filename, audio, format))
+            for index, (filename, audio) in enumerate(files)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield _ndjson(await next_done)
+        finally:
+            # 客户端提前断开时取消尚未完成的识别
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type=NDJSON)
+
+
+async def _read_json(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="JSON object expected")
+    return body
+
+
+def _require_text(body: dict) -> str:
+    text = body.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise HTTPException(status_code=400, detail="text is required")
+    return text
+
+
+@router.post("/tts")
+async def synthesize(request: Request):
+    """语音合成：边合成边返回 MP3 数据"""
+    text = _require_text(await _read_json(request))
+    _require_ready("tts")
+    stream = manager.tts.stream(text)
+    try:
+        # 先取第一块数据，合成失败时能返回正确的状态码而不是中断的 200 响应
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except TTSError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def audio() -> AsyncIterator[bytes]:
+        if first:
+            yield first
+        try:
+            async for chunk in stream:
+                yield chunk
+        except TTSError as e:
+            logger.error(f"TTS stream aborted: {str(e)}")
+
+    return StreamingResponse(audio(), media_type="audio/mpeg")
+
+
+@router.post("/llm")
+async def chat(request: Request):
+    """
+    文本对话：stream=true 时以 NDJSON 逐段返回 {"delta": ...}，最后一行为 {"done": true, "text": ...}；
+    提供 session_id 时读写该会话的对话历史。
+    """
+    body = await _read_json(request)
+    text = _require_text(body)
+    session_id: Optional[str] = body.get("session_id")
+    if session_id is not None and (not isinstance(session_id, str) or not SESSION_ID_PATTERN.match(session_id)):
+        raise HTTPException(status_code=400, detail="invalid session_id")
+    _require_ready("llm")
+
+    if not body.get("stream"):
+        try:
+            parts = [delta async for delta in llm.stream(text, session_id)]
+        except LLMError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        return JSONResponse({"text": "".join(parts)})
+
+    async def deltas() -> AsyncIterator[bytes]:
+        parts = []
+        try:
+            async for delta in llm.stream(text, session_id):
+                parts.append(delta)
+                yield _ndjson({"delta": delta})
+        except LLMError as e:
+            yield _ndjson({"error": str(e)})
+            return
+        yield _ndjson({"done": True, "text": "".join(parts)})
+
+    return StreamingResponse(deltas(), media_type=NDJSON)
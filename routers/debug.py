@@ -0,0 +1,87 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from config.settings import settings
+from services.tracing import tracer
+from services.profiling import profiler, loop_monitor, dump_tasks
+
+# 创建路由对象
+router = APIRouter(prefix="/debug")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """管理端点鉴权：未配置令牌时一律拒绝"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+
+@router.get("/traces", dependencies=[Depends(require_admin)])
+async def get_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    client_id: Optional[str] = None,
+    min_duration_ms: float = Query(0, ge=0),
+):
+    """最近的对话轮次追踪，可按客户端与最小耗时过滤（用于定位 p99 异常轮次）"""
+    return {
+        "enabled": tracer.enabled,
+        "traces": tracer.recent_traces(limit=limit, client_id=client_id, min_duration_ms=min_duration_ms),
+    }
+
+
+@router.post("/profile/start", dependencies=[Depends(require_admin)])
+async def start_profile(
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    interval_ms: float = Query(5, gt=0, le=1000),
+    seconds: float = Query(0, ge=0, le=600),
+):
+    """开始剖析；seconds > 0 时到时自动停止，结果通过 /debug/profile/result 获取"""
+    try:
+        return profiler.start(mode, interval_ms, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/profile/stop", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """停止剖析并返回结果（采样模式为折叠栈，cprofile 模式为 pstats 文本）"""
+    try:
+        return PlainTextResponse(profiler.stop())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/profile/result", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_result():
+    """最近一次剖析结果"""
+    if profiler.last_result is None:
+        raise HTTPException(status_code=404, detail="no profile result")
+    return PlainTextResponse(profiler.last_result)
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_for(
+    seconds: float = Query(10, gt=0, le=600),
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    interval_ms: float = Query(5, gt=0, le=1000),
+):
+    """剖析 N 秒后直接返回结果"""
+    try:
+        return PlainTextResponse(await profiler.profile_for(seconds, mode, interval_ms))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/tasks", dependencies=[Depends(require_admin)])
+async def get_tasks(limit: int = Query(20, ge=1, le=200)):
+    """导出所有 asyncio 任务的调用栈"""
+    tasks = dump_tasks(limit)
+    return {"count": len(tasks), "tasks": tasks}
+
+
+@router.get("/loop-lag", dependencies=[Depends(require_admin)])
+async def get_loop_lag():
+    """事件循环延迟统计与最近的阻塞记录"""
+    return {"enabled": settings.LOOP_LAG_ENABLED, **loop_monitor.stats()}
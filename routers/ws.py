@@ -6,23 +6,43 @@ from fastapi.websockets import WebSocketDisconnect
 from services.asr import ASRService
 from services.tts import TTSService
 from services.llm import LLMService
-from typing import Dict, List
+from services.governor import ConnectionGovernor
+from services.conversation_store import ConversationStore, create_conversation_store
+from services import metrics
+from services.tracing import tracer, Span
+from services.health import health
+from config.settings import settings
+from typing import Dict, List, Optional
+import re
 import uuid
 import time
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class DialogueState:
-    def __init__(self):
+    def __init__(self, session_id: str):
+        self.session_id: str = session_id  # 会话 ID，重连时用于恢复对话历史
         self.messages: List[Dict[str, str]] = []
         self.is_speaking: bool = False
         self.last_interaction_time: float = time.time()
+        self.last_pong_time: float = time.time()
         self.context_window: int = 5  # 保留最近5轮对话
         self.audio_buffer: List[bytes] = []  # 用于存储音频数据
         self.processing: bool = False  # 标记是否正在处理
+        self.audio_stream = None  # 流式上传（audio_start ... audio_end）中的解码器
+        self.discard_audio: bool = False  # 流式上传初始化失败时丢弃后续分块直到 audio_end
+        self.turn_count: int = 0  # 已开始的对话轮次数，用作追踪中的 turn_id
+        self.pending_turns: int = 0  # 已入队但尚未处理完成的轮次数
+
+    @property
+    def busy(self) -> bool:
+        """是否有进行中的轮次（排空时需等待其完成）"""
+        return self.processing or self.audio_stream is not None or self.pending_turns > 0
+
+    def next_turn_id(self) -> int:
+        self.turn_count += 1
+        return self.turn_count
 
     def add_message(self, role: str, content: str):
         self.messages.append({"role": role, "content": content})
@@ -45,37 +65,134 @@ class DialogueState:
         return b''.join(self.audio_buffer)
 
 
+class DialogueStateStore(ConversationStore):
+    """以每个连接的 DialogueState 作为对话历史存储，并写透到共享的会话存储"""
+
+    def __init__(self, dialogue_states: Dict[str, DialogueState], backend: ConversationStore):
+        self.dialogue_states = dialogue_states
+        self.backend = backend
+
+    async def load(self, client_id: str) -> List[Dict[str, str]]:
+        state = self.dialogue_states.get(client_id)
+        if not state:
+            return []
+        # 以共享存储为准，其他工作进程可能已更新该会话
+        state.messages = await self.backend.load(state.session_id)
+        return list(state.get_context())
+
+    async def save(self, client_id: str, messages: List[Dict[str, str]]):
+        state = self.dialogue_states.get(client_id)
+        if state:
+            state.messages = list(messages)
+            await self.backend.save(state.session_id, messages)
+
+    async def clear(self, client_id: str):
+        state = self.dialogue_states.get(client_id)
+        if state:
+            state.messages = []
+            await self.backend.clear(state.session_id)
+
+    async def close(self):
+        await self.backend.close()
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.dialogue_states: Dict[str, DialogueState] = {}
-        self.asr = ASRService()
+        # 模型在启动后的后台任务中加载，导入本模块不再阻塞进程启动
+        self.asr = ASRService(load=False)
         self.tts = TTSService()
-        self.llm = LLMService()
+        self.session_store = create_conversation_store()
+        self.llm = LLMService(store=DialogueStateStore(self.dialogue_states, self.session_store))
+        self.governor = ConnectionGovernor()
         self.task_queue = asyncio.Queue()
         self.current_task = None
-        self.heartbeat_interval = 30  # 心跳间隔（秒）
+        self.reaper_task = None
+        self.heartbeat_interval = settings.WS_PING_INTERVAL  # 心跳间隔（秒）
+        self.startup_task = None
+        self.drain_task = None
+        settings.subscribe(self._on_settings_change)
+        # 文本对话不依赖 ASR：模型加载期间即可建立会话，语音轮次等 ASR 就绪后才处理
+        health.register_capability("text", ("tts", "llm", "session_store"))
+        health.register_capability("audio", ("asr", "tts", "llm", "session_store"))
         logger.info("ConnectionManager initialized")
 
-    async def handle_websocket(self, websocket: WebSocket, client_id: str):
+    def _on_settings_change(self, new, old):
+        self.heartbeat_interval = new.WS_PING_INTERVAL
+
+    def startup(self):
+        """在后台加载模型并预热，就绪状态通过 health 暴露"""
+        if not self.startup_task:
+            self.startup_task = asyncio.create_task(self._load_services())
+
+    async def _load_services(self):
+        # TTS 与 LLM 只依赖远程服务；TTS 预先建立合成连接，失败时按需重连
+        health.mark_loading("tts")
+        await self.tts.start()
+        health.mark_ready("tts")
+        health.mark_ready("llm")
+
+        health.mark_loading("session_store")
+        try:
+            await self.session_store.ping()
+            health.mark_ready("session_store")
+        except Exception as e:
+            health.mark_failed("session_store", str(e))
+
+        health.mark_loading("asr")
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.asr.load)
+            text = await self.asr.warm_up()
+            logger.info(f"ASR warm-up finished: {text}")
+            health.mark_ready("asr")
+        except Exception as e:
+            health.mark_failed("asr", str(e))
+
+    async def handle_websocket(self, websocket: WebSocket, client_id: str, session_id: Optional[str] = None):
+        heartbeat_task = None
         try:
             logger.info(f"Accepting WebSocket connection for client: {client_id}")
             await websocket.accept()
+
+            # 排空中：提示客户端连接其他实例
+            if health.draining:
+                await self._reject_restarting(websocket)
+                return
+
+            # 文本对话所需服务未就绪或过载时快速拒绝
+            if not health.capable("text") or not self.governor.admit_session(len(self.active_connections)):
+                await self._reject_busy(websocket)
+                return
+
             self.active_connections[client_id] = websocket
-            self.dialogue_states[client_id] = DialogueState()
+            session_id = session_id or client_id
+            self.dialogue_states[client_id] = DialogueState(session_id)
+            metrics.ACTIVE_SESSIONS.set(len(self.active_connections))
+
+            # 告知客户端会话 ID，断线重连时携带以恢复对话历史
+            await websocket.send_text(json.dumps({
+                "type": "session",
+                "session_id": session_id
+            }))
             
             # 启动心跳检测
             heartbeat_task = asyncio.create_task(self._heartbeat(websocket, client_id))
+            # 启动空闲会话回收
+            if not self.reaper_task:
+                self.reaper_task = asyncio.create_task(self._reap_sessions())
             
-            logger.info(f"New connection established: {client_id}")
+            logger.info(f"New connection established: {client_id} (session {session_id})")
 
             while True:
                 try:
                     # 等待接收消息
                     message = await websocket.receive()
-                    
-                    # 更新最后交互时间
-                    self.dialogue_states[client_id].last_interaction_time = time.time()
+
+                    if message.get("type") == "websocket.disconnect":
+                        logger.info(f"WebSocket disconnected: {client_id}")
+                        break
 
                     # 根据消息类型处理
                     if "text" in message:
@@ -101,9 +218,58 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"WebSocket error for {client_id}: {str(e)}")
         finally:
-            heartbeat_task.cancel()
+            if heartbeat_task:
+                heartbeat_task.cancel()
             await self.cleanup_connection(client_id)
 
+    async def _reject_busy(self, websocket: WebSocket):
+        """以“忙碌”消息和关闭码拒绝连接"""
+        try:
+            await websocket.send_text(json.dumps({
+                "type": "busy",
+                "error": "服务器繁忙，请稍后重试"
+            }))
+            await websocket.close(code=self.governor.busy_close_code, reason="server busy")
+        except Exception as e:
+            logger.warning(f"Failed to reject busy connection: {str(e)}")
+
+    async def _reject_restarting(self, websocket: WebSocket):
+        """排空期间的新连接：发送重连提示后以 Service Restart 关闭"""
+        try:
+            await self._send_reconnect(websocket)
+            await websocket.close(code=self.governor.restart_close_code, reason="server restarting")
+        except Exception as e:
+            logger.warning(f"Failed to reject connection while draining: {str(e)}")
+
+    async def _send_reconnect(self, websocket: WebSocket, session_id: Optional[str] = None):
+        """通知客户端当前进程即将退出，应携带 session_id 重新连接"""
+        message = {"type": "reconnect", "reason": "server restarting"}
+        if session_id:
+            message["session_id"] = session_id
+        await websocket.send_text(json.dumps(message))
+
+    async def _refuse_while_draining(self, client_id: str) -> bool:
+        """排空期间不再开始新轮次，返回 True 表示消息已被拒绝"""
+        if not health.draining:
+            return False
+        websocket = self.active_connections.get(client_id)
+        state = self.dialogue_states.get(client_id)
+        if websocket:
+            await self._send_reconnect(websocket, state.session_id if state else None)
+        return True
+
+    async def _refuse_until_asr_ready(self, client_id: str) -> bool:
+        """ASR 模型尚未加载完成时拒绝语音轮次，返回 True 表示消息已被拒绝"""
+        if health.capable("audio"):
+            return False
+        websocket = self.active_connections.get(client_id)
+        if websocket:
+            await websocket.send_text(json.dumps({
+                "type": "error",
+                "error": "语音识别尚未就绪，请稍后重试或发送文字"
+            }))
+        return True
+
     async def _heartbeat(self, websocket: WebSocket, client_id: str):
         """心跳检测"""
         try:
@@ -114,101 +280,240 @@ class ConnectionManager:
                         await websocket.send_text(json.dumps({"type": "ping"}))
                     except:
                         logger.warning(f"Heartbeat failed for client {client_id}")
+                        # 主动关闭连接，避免接收端一直阻塞到对端超时
+                        try:
+                            await websocket.close(code=1011)
+                        except Exception:
+                            pass
                         await self.cleanup_connection(client_id)
                         break
         except asyncio.CancelledError:
             pass
 
+    async def _reap_sessions(self):
+        """定期回收空闲或无响应的会话"""
+        try:
+            while self.active_connections:
+                await asyncio.sleep(self.governor.reap_interval)
+                for client_id, reason in self.governor.find_expired(self.dialogue_states):
+                    websocket = self.active_connections.get(client_id)
+                    logger.info(f"Reaping {reason} session: {client_id}")
+                    metrics.SESSIONS_REAPED.labels(reason).inc()
+                    await self.cleanup_connection(client_id)
+                    if websocket:
+                        try:
+                            await websocket.close(code=self.governor.reap_close_code, reason=reason)
+                        except Exception:
+                            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.reaper_task = None
+
+    def _start_turn_trace(self, client_id: str, source: str) -> Optional[Span]:
+        """为新的对话轮次开始一条 trace"""
+        state = self.dialogue_states.get(client_id)
+        turn_id = state.next_turn_id() if state else 0
+        return tracer.start_trace("turn", client_id=client_id, turn_id=turn_id, source=source)
+
+    async def _enqueue_turn(self, client_id: str, text: str, trace: Optional[Span] = None):
+        """提交对话轮次，排队已满时直接返回忙碌提示"""
+        if trace is None:
+            trace = self._start_turn_trace(client_id, "text")
+        if not self.governor.acquire_turn():
+            tracer.finish(trace, status="rejected")
+            websocket = self.active_connections.get(client_id)
+            if websocket:
+                await websocket.send_text(json.dumps({
+                    "type": "busy",
+                    "error": "服务器繁忙，请稍后重试"
+                }))
+            return
+        state = self.dialogue_states.get(client_id)
+        if state:
+            state.pending_turns += 1
+        await self.task_queue.put((text, client_id, time.perf_counter(), trace))
+        if not self.current_task:
+            self.current_task = asyncio.create_task(self.process_queue())
+
     async def _handle_text_message(self, client_id: str, message: str):
         """处理文本消息"""
         try:
-            logger.info(f"Received text message from {client_id}: {message[:100]}...")
+            logger.debug(f"Received text message: {len(message)} chars", extra={"client_id": client_id})
 
             try:
                 data = json.loads(message)
-                logger.info(f"Parsed JSON data: {data}")
+                logger.debug(f"Parsed message type: {data.get('type')}", extra={"client_id": client_id})
 
                 # 处理心跳响应
                 if data.get("type") == "pong":
+                    self.dialogue_states[client_id].last_pong_time = time.time()
+                    return
+
+                # 更新最后交互时间
+                self.dialogue_states[client_id].last_interaction_time = time.time()
+
+                # 流式音频上传：声明编码后逐块发送二进制数据，边接收边解码
+                if data.get("type") == "audio_start":
+                    if await self._refuse_while_draining(client_id) or await self._refuse_until_asr_ready(client_id):
+                        # 丢弃本次上传的分块，直到 audio_end
+                        self.dialogue_states[client_id].discard_audio = True
+                        return
+                    await self._start_audio_stream(client_id, data.get("codec", "auto"))
+                    return
+                if data.get("type") == "audio_end":
+                    await self._finish_audio_stream(client_id)
                     return
 
                 # 处理文本消息
                 if data.get("type") == "text":
                     text = data.get("text", "")
-                    if text:
-                        logger.info(f"Processing text message: {text}")
-                        await self.task_queue.put((text, client_id))
-                        if not self.current_task:
-                            self.current_task = asyncio.create_task(self.process_queue())
+                    if text and not await self._refuse_while_draining(client_id):
+                        logger.info(f"Processing text message: {text}", extra={"client_id": client_id})
+                        await self._enqueue_turn(client_id, text)
                     return
 
             except json.JSONDecodeError:
                 # 如果不是JSON，作为普通文本处理
-                if message.strip():
-                    logger.info(f"Processing plain text message: {message}")
-                    await self.task_queue.put((message, client_id))
-                    if not self.current_task:
-                        self.current_task = asyncio.create_task(self.process_queue())
+                if message.strip() and not await self._refuse_while_draining(client_id):
+                    self.dialogue_states[client_id].last_interaction_time = time.time()
+                    logger.info(f"Processing plain text message: {message}", extra={"client_id": client_id})
+                    await self._enqueue_turn(client_id, message)
                 return
 
         except Exception as e:
             logger.error(f"Error handling text message: {str(e)}")
             raise
 
+    async def _start_audio_stream(self, client_id: str, codec: str):
+        """开始一次流式上传：按声明的编码启动解码器"""
+        state = self.dialogue_states[client_id]
+        if state.audio_stream is not None:
+            logger.warning("Previous audio stream not finished, discarding", extra={"client_id": client_id})
+            await state.audio_stream.abort()
+            state.audio_stream = None
+        state.discard_audio = False
+        try:
+            state.audio_stream = await self.asr.open_stream(codec)
+        except Exception as e:
+            logger.error(f"Failed to open audio stream ({codec}): {str(e)}", extra={"client_id": client_id})
+            state.discard_audio = True
+            websocket = self.active_connections.get(client_id)
+            if websocket:
+                await websocket.send_text(json.dumps({
+                    "type": "error",
+                    "error": f"音频流初始化失败: {str(e)}"
+                }))
+
+    async def _finish_audio_stream(self, client_id: str):
+        """流式上传结束：取出解码结果并识别"""
+        state = self.dialogue_states[client_id]
+        stream = state.audio_stream
+        websocket = self.active_connections.get(client_id)
+        state.discard_audio = False
+        if stream is None or websocket is None:
+            return
+        state.audio_stream = None
+
+        async def transcribe() -> str:
+            with tracer.span("asr", audio_bytes=stream.bytes_received, streaming=True):
+                return await self.asr.finish_stream(stream)
+
+        await self._run_audio_turn(websocket, client_id, transcribe)
+
     async def _handle_binary_message(self, websocket: WebSocket, client_id: str, audio_data: bytes):
         """处理二进制音频数据"""
         try:
-            logger.info(f"Received audio data from {client_id}: {len(audio_data)} bytes")
+            logger.debug(f"Received audio data: {len(audio_data)} bytes", extra={"client_id": client_id})
+            metrics.AUDIO_BYTES_RECEIVED.inc(len(audio_data))
+            state = self.dialogue_states[client_id]
+
+            # 流式上传中：直接送入解码器，等待 audio_end
+            if state.discard_audio:
+                return
+            if state.audio_stream is not None:
+                state.last_interaction_time = time.time()
+                await state.audio_stream.feed(audio_data)
+                return
             
+            # 排空期间或 ASR 未就绪时不再开始新的整段音频轮次
+            if not state.processing and (
+                await self._refuse_while_draining(client_id) or await self._refuse_until_asr_ready(client_id)
+            ):
+                return
+
             # 将音频数据添加到缓冲区
-            self.dialogue_states[client_id].add_audio_chunk(audio_data)
+            state.add_audio_chunk(audio_data)
             
             # 如果正在处理，则跳过
-            if self.dialogue_states[client_id].processing:
+            if state.processing:
                 return
-                
-            # 标记为正在处理
-            self.dialogue_states[client_id].processing = True
-            
-            try:
-                # 获取完整的音频数据
-                complete_audio = self.dialogue_states[client_id].get_audio_data()
-                
-                # 语音识别
-                text = await self.asr.transcribe(complete_audio)
-                logger.info(f"Transcribed text from {client_id}: {text}")
-
-                # 发送识别结果回前端
-                await websocket.send_text(json.dumps({
-                    "text": text,
-                    "type": "transcription"
-                }))
 
-                # 提交处理任务
-                if text and text.strip():
-                    logger.info(f"Submitting transcribed text for processing: {text}")
-                    await self.task_queue.put((text, client_id))
-                    if not self.current_task:
-                        self.current_task = asyncio.create_task(self.process_queue())
-            finally:
-                # 清除音频缓冲区
-                self.dialogue_states[client_id].clear_audio_buffer()
-                # 标记处理完成
-                self.dialogue_states[client_id].processing = False
+            async def transcribe() -> str:
+                # 获取完整的音频数据（格式由 FFmpeg 自动探测）
+                with tracer.span("receive", chunks=len(state.audio_buffer)):
+                    complete_audio = state.get_audio_data()
+                with tracer.span("asr", audio_bytes=len(complete_audio)):
+                    return await self.asr.transcribe(complete_audio)
+
+            await self._run_audio_turn(websocket, client_id, transcribe)
 
         except Exception as e:
             logger.error(f"Error handling binary message: {str(e)}")
             raise
 
+    async def _run_audio_turn(self, websocket: WebSocket, client_id: str, transcribe):
+        """执行一次语音轮次：识别、回传识别结果并提交后续处理"""
+        state = self.dialogue_states[client_id]
+        # 标记为正在处理
+        state.processing = True
+
+        trace = self._start_turn_trace(client_id, "audio")
+        token = tracer.activate(trace)
+        submitted = False
+        try:
+            # 语音识别
+            text = await transcribe()
+            logger.info(f"Transcribed text: {text}", extra={"client_id": client_id})
+
+            # 发送识别结果回前端
+            await websocket.send_text(json.dumps({
+                "text": text,
+                "type": "transcription"
+            }))
+
+            # 提交处理任务
+            if text and text.strip():
+                logger.debug("Submitting transcribed text for processing", extra={"client_id": client_id})
+                submitted = True
+                await self._enqueue_turn(client_id, text, trace)
+        finally:
+            tracer.deactivate(token)
+            if not submitted:
+                tracer.finish(trace, status="empty")
+            # 清除音频缓冲区
+            state.clear_audio_buffer()
+            # 标记处理完成
+            state.processing = False
+
     async def process_queue(self):
         """处理任务队列"""
         try:
             while not self.task_queue.empty():
-                text, client_id = await self.task_queue.get()
+                text, client_id, enqueued_at, trace = await self.task_queue.get()
+                queue_wait = time.perf_counter() - enqueued_at
+                metrics.QUEUE_WAIT_SECONDS.observe(queue_wait)
+                if trace:
+                    trace.set_attribute("queue_wait_ms", round(queue_wait * 1000, 3))
                 websocket = self.active_connections.get(client_id)
                 if not websocket:
+                    self.governor.release_turn()
+                    tracer.finish(trace, status="disconnected")
                     continue
 
+                stage = "llm"
+                status = "ok"
+                token = tracer.activate(trace)
                 try:
                     # 检查文本是否为空
                     if not text or text.strip() == "":
@@ -216,31 +521,48 @@ class ConnectionManager:
                         continue
 
                     # LLM 生成
-                    logger.info(f"Generating response for text: {text}")
-                    response = await self.llm.generate(text)
-                    logger.info(f"LLM response for {client_id}: {response}")
+                    logger.debug("Generating response", extra={"client_id": client_id})
+                    response = await self.llm.generate(text, client_id)
+                    logger.info(f"LLM response: {response}", extra={"client_id": client_id})
 
                     # 发送文本响应回前端
+                    stage = "send"
                     await websocket.send_text(json.dumps({
                         "text": response,
                         "type": "response"
                     }))
 
                     # TTS 合成
+                    stage = "tts"
                     audio = await self.tts.synthesize(response)
 
                     # 分块发送
+                    stage = "send"
                     chunk_size = 4096
-                    for i in range(0, len(audio), chunk_size):
-                        try:
-                            await websocket.send_bytes(audio[i:i + chunk_size])
-                        except WebSocketDisconnect:
-                            return
-                        except Exception as e:
-                            logger.error(f"Error sending audio chunk to {client_id}: {str(e)}")
-                            return
+                    with tracer.span("send", audio_bytes=len(audio)):
+                        for i in range(0, len(audio), chunk_size):
+                            try:
+                                await websocket.send_bytes(audio[i:i + chunk_size])
+                                if i == 0:
+                                    metrics.TIME_TO_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - enqueued_at)
+                            except WebSocketDisconnect:
+                                status = "disconnected"
+                                break
+                            except Exception as e:
+                                logger.error(f"Error sending audio chunk to {client_id}: {str(e)}")
+                                status = "error"
+                                break
+                    # 通知客户端本轮音频发送完毕
+                    if status == "ok":
+                        await websocket.send_text(json.dumps({"type": "audio_end"}))
+                    metrics.TURN_SECONDS.observe(time.perf_counter() - enqueued_at)
+                    metrics.TURNS.inc()
 
                 except Exception as e:
+                    status = "error"
+                    if trace:
+                        trace.set_attribute("error_stage", stage)
+                    metrics.TURN_ERRORS.labels(stage).inc()
                     logger.error(f"Error processing message for {client_id}: {str(e)}")
                     try:
                         await websocket.send_text(json.dumps({
@@ -249,6 +571,13 @@ class ConnectionManager:
                         }))
                     except:
                         pass
+                finally:
+                    self.governor.release_turn()
+                    state = self.dialogue_states.get(client_id)
+                    if state:
+                        state.pending_turns -= 1
+                    tracer.deactivate(token)
+                    tracer.finish(trace, status=status)
 
         except Exception as e:
             logger.error(f"Error processing queue: {str(e)}")
@@ -260,15 +589,73 @@ class ConnectionManager:
         if client_id in self.active_connections:
             del self.active_connections[client_id]
         if client_id in self.dialogue_states:
-            del self.dialogue_states[client_id]
-        if self.current_task:
-            self.current_task.cancel()
-        while not self.task_queue.empty():
+            state = self.dialogue_states.pop(client_id)
+            if state.audio_stream is not None:
+                await state.audio_stream.abort()
+        metrics.ACTIVE_SESSIONS.set(len(self.active_connections))
+        # 队列中属于该连接的轮次会在 process_queue 中被跳过，
+        # 不再清空整个队列，以免误删其他会话的轮次
+        logger.info(f"Cleaned up connection: {client_id}")
+
+    async def drain(self, timeout: float):
+        """
+        排空：就绪检查转为失败并拒绝新连接，通知客户端重连；
+        空闲的会话立即关闭，进行中的轮次在 timeout 内完成后关闭，超时后强制关闭剩余会话
+        """
+        if self.drain_task is None:
+            self.drain_task = asyncio.create_task(self._drain(timeout))
+        await asyncio.shield(self.drain_task)
+
+    async def _drain(self, timeout: float):
+        health.start_draining()
+        logger.info(f"Draining {len(self.active_connections)} sessions (timeout {timeout}s)")
+        for client_id, websocket in list(self.active_connections.items()):
+            state = self.dialogue_states.get(client_id)
             try:
-                self.task_queue.get_nowait()
-            except:
+                await self._send_reconnect(websocket, state.session_id if state else None)
+            except Exception:
                 pass
-        logger.info(f"Cleaned up connection: {client_id}")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.active_connections:
+            for client_id in list(self.active_connections):
+                state = self.dialogue_states.get(client_id)
+                if state is None or not state.busy:
+                    await self._close_for_restart(client_id)
+            if not self.active_connections or loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.1)
+
+        if self.active_connections:
+            logger.warning(f"Drain timeout exceeded, closing {len(self.active_connections)} busy sessions")
+            for client_id in list(self.active_connections):
+                await self._close_for_restart(client_id)
+        logger.info("Drain complete")
+
+    async def _close_for_restart(self, client_id: str):
+        websocket = self.active_connections.get(client_id)
+        await self.cleanup_connection(client_id)
+        if websocket:
+            try:
+                await websocket.close(code=self.governor.restart_close_code, reason="server restarting")
+            except Exception:
+                pass
+
+    async def shutdown(self):
+        """停止后台任务并释放线程池、推理进程与网络连接（在排空之后调用）"""
+        for task in (self.startup_task, self.reaper_task, self.current_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        await self.tts.close()
+        await self.tts.cleanup()
+        await self.session_store.close()
+        self.asr.close()
+        logger.info("ConnectionManager shut down")
 
 
 # 创建路由对象
@@ -278,8 +665,16 @@ router = APIRouter()
 manager = ConnectionManager()
 
 
+# 会话 ID 只允许字母、数字、下划线和连字符
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
 # 注册WebSocket路由
 @router.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket):
     client_id = str(uuid.uuid4())
-    await manager.handle_websocket(websocket, client_id)
+    session_id = websocket.query_params.get("session_id")
+    if session_id and not SESSION_ID_PATTERN.match(session_id):
+        logger.warning(f"Invalid session_id from client {client_id}, starting new session")
+        session_id = None
+    await manager.handle_websocket(websocket, client_id, session_id)
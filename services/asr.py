@@ -1,22 +1,44 @@
 import os
+import asyncio
 import logging
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from funasr import AutoModel
-from funasr.utils.postprocess_utils import rich_transcription_postprocess
+from typing import List, Optional, Set
+import numpy as np
 from exceptions import ASRError, FFmpegError
 from config.settings import settings
+from services import metrics
+from services.tracing import tracer
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 预热用的内置样例音频
+WARMUP_AUDIO = os.path.join("test", "sample", "sample-3s.wav")
+
+# 客户端可声明的输入编码 -> FFmpeg 解复用器（None 表示由 FFmpeg 自动探测）
+# opus 为带 2 字节大端长度前缀的原始 Opus 包，由 opuslib 直接解码，不经过 FFmpeg
+INPUT_FORMATS = {
+    "auto": None,
+    "wav": "wav",
+    "webm": "matroska",
+    "ogg": "ogg",
+    "mp3": "mp3",
+    "opus": None,
+}
+
+
+def pcm_to_float(pcm) -> np.ndarray:
+    """16-bit PCM 转为模型输入的 float32 波形（返回新数组，不引用原缓冲区）"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
 
 class FFmpegProcessor:
     """FFmpeg 音频处理类"""
-    def __init__(self):
-        self._check_ffmpeg()
+    def __init__(self, check: bool = True):
+        if check:
+            self._check_ffmpeg()
         # 从配置管理器获取音频配置
         audio_config = settings.ASR_AUDIO
         self.target_sr = audio_config.get('target_sr', 16000)
@@ -53,6 +75,47 @@ class FFmpegProcessor:
             # 读取处理后的数据
             return self._read_wav(output_path)
 
+    def process_pcm(self, audio_data: bytes, input_format: str = "auto") -> bytes:
+        """通过管道解码音频，直接返回 16-bit 单声道 PCM，不落盘"""
+        with metrics.FFMPEG_SECONDS.time():
+            return self._decode_pcm(audio_data, input_format)
+
+    def open_stream(self, input_format: str = "auto") -> "FFmpegStreamDecoder":
+        """创建流式解码器，音频可以边接收边解码"""
+        return FFmpegStreamDecoder(self._pcm_command(input_format))
+
+    def _pcm_command(self, input_format: str = "auto") -> list:
+        demuxer = INPUT_FORMATS.get(input_format)
+        cmd = ["ffmpeg"]
+        if demuxer:
+            # 声明了输入格式时跳过探测，流式输入也无需等待足够的数据再判断格式
+            cmd += ["-f", demuxer]
+        return cmd + [
+            "-i", "pipe:0",
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",  # 16-bit PCM
+            "-ar", str(self.target_sr),  # 采样率
+            "-ac", str(self.channels),  # 声道数
+            "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",  # 音频标准化
+            "-hide_banner",
+            "-loglevel", "error",
+            "pipe:1"
+        ]
+
+    def _decode_pcm(self, audio_data: bytes, input_format: str = "auto") -> bytes:
+        cmd = self._pcm_command(input_format)
+        try:
+            proc = subprocess.run(
+                cmd,
+                input=audio_data,
+                check=True,
+                capture_output=True
+            )
+            return proc.stdout
+
+        except subprocess.CalledProcessError as e:
+            raise FFmpegError(f"音频转换失败: {e.stderr.decode('utf-8', errors='ignore')}")
+
     def _convert_audio(self, input_path: Path, output_path: Path) -> None:
         """执行 FFmpeg 转换命令"""
         cmd = [
@@ -93,64 +156,428 @@ class FFmpegProcessor:
             raise FFmpegError(f"读取 WAV 文件失败: {str(e)}")
 
 
+class FFmpegStreamDecoder:
+    """流式解码：音频分块写入 FFmpeg 标准输入，同时在后台读取 PCM 输出"""
+
+    def __init__(self, cmd: list):
+        self.cmd = cmd
+        self.bytes_received = 0
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._stdout: Optional[asyncio.Task] = None
+        self._stderr: Optional[asyncio.Task] = None
+        self._broken = False
+
+    async def start(self):
+        self._proc = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._stdout = asyncio.create_task(self._proc.stdout.read())
+        self._stderr = asyncio.create_task(self._proc.stderr.read())
+
+    async def feed(self, chunk: bytes):
+        self.bytes_received += len(chunk)
+        if self._broken:
+            return
+        try:
+            self._proc.stdin.write(chunk)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # FFmpeg 已退出，错误信息在 finish() 中报告
+            self._broken = True
+
+    async def finish(self) -> bytes:
+        """结束输入并返回解码后的 16-bit PCM"""
+        if not self._broken:
+            try:
+                self._proc.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        pcm = await self._stdout
+        stderr = await self._stderr
+        if await self._proc.wait() != 0:
+            raise FFmpegError(f"音频转换失败: {stderr.decode('utf-8', errors='ignore')}")
+        return pcm
+
+    async def abort(self):
+        if self._proc and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        for task in (self._stdout, self._stderr):
+            if task:
+                task.cancel()
+
+
+class OpusPacketDecoder:
+    """原始 Opus 包解码：每个包前带 2 字节大端长度，直接以 ASR 采样率解码，无需重采样"""
+
+    MAX_FRAME_MS = 120
+
+    def __init__(self, sample_rate: int, channels: int = 1):
+        try:
+            import opuslib
+        except ImportError:
+            raise FFmpegError("解码原始 Opus 需要安装 opuslib")
+        self._decoder = opuslib.Decoder(sample_rate, channels)
+        self._frame_size = sample_rate * self.MAX_FRAME_MS // 1000
+        self._pending = bytearray()
+        self._pcm = bytearray()
+        self.bytes_received = 0
+
+    async def start(self):
+        pass
+
+    async def feed(self, chunk: bytes):
+        self.bytes_received += len(chunk)
+        self.decode(chunk)
+
+    def decode(self, chunk: bytes):
+        """解码所有完整的包，不完整的包留到下一块数据"""
+        self._pending += chunk
+        while len(self._pending) >= 2:
+            size = int.from_bytes(self._pending[:2], "big")
+            if len(self._pending) < 2 + size:
+                break
+            packet = bytes(self._pending[2:2 + size])
+            del self._pending[:2 + size]
+            try:
+                self._pcm += self._decoder.decode(packet, self._frame_size)
+            except Exception as e:
+                raise FFmpegError(f"Opus 解码失败: {str(e)}")
+
+    @property
+    def pcm(self) -> bytes:
+        if self._pending:
+            logger.warning(f"丢弃不完整的 Opus 包: {len(self._pending)} bytes")
+        return bytes(self._pcm)
+
+    async def finish(self) -> bytes:
+        return self.pcm
+
+    async def abort(self):
+        pass
+
+
+class RecognitionBatcher:
+    """
+    将并发的识别请求合并为一次 model.generate 批量推理。
+    队列中只有一个请求时立即提交，不额外等待；已有第二个请求排队时才打开合并窗口（window_ms），
+    因此单路对话不增加延迟，只有并发请求会被合并。
+    同时执行的批次数不超过线程池大小（concurrency）：线程都在推理时不再提交新批次，
+    期间到达的请求留在队列中，等有空闲线程时合并为下一批。
+    """
+
+    def __init__(self, service: "ASRService", max_size: int, window_ms: float, concurrency: int = 1):
+        self.service = service
+        self.max_size = max_size
+        self.window = window_ms / 1000.0
+        self.concurrency = concurrency
+        self._free_threads: Optional[asyncio.Semaphore] = None
+        self._free_threads_size = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在执行的批次；事件循环只持有任务的弱引用，需在这里保留以免被回收
+        self._running: Set[asyncio.Task] = set()
+        self._closed = False
+        self._cancelled = False
+
+    async def submit(self, samples: np.ndarray) -> str:
+        loop = asyncio.get_running_loop()
+        if self._closed:
+            return await loop.run_in_executor(self.service._executor, self.service.recognize, samples)
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._loop = loop
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._collect(), name="asr-batcher")
+        future = loop.create_future()
+        self._queue.put_nowait((samples, future))
+        return await future
+
+    def _threads(self) -> asyncio.Semaphore:
+        # 热加载调整线程池大小后换用新的信号量，执行中的批次归还到各自取得的信号量
+        if self._free_threads is None or self._free_threads_size != self.concurrency:
+            self._free_threads = asyncio.Semaphore(max(1, self.concurrency))
+            self._free_threads_size = self.concurrency
+        return self._free_threads
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            threads = self._threads()
+            await threads.acquire()
+            try:
+                batch = [await self._queue.get()]
+            except asyncio.CancelledError:
+                threads.release()
+                raise
+            if not self._queue.empty():
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                    except asyncio.CancelledError:
+                        # 关闭时已取出的请求与队列中剩余的请求同样处理
+                        if self._cancelled:
+                            self._fail(batch)
+                            threads.release()
+                        else:
+                            self._dispatch(batch, threads)
+                        raise
+            # 不等待本批完成即开始收集下一批，并发度由线程池大小限制
+            self._dispatch(batch, threads)
+
+    def _dispatch(self, batch: list, threads: Optional[asyncio.Semaphore] = None):
+        task = asyncio.get_running_loop().create_task(self._run(batch, threads))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list, threads: Optional[asyncio.Semaphore] = None):
+        metrics.ASR_BATCH_SIZE.observe(len(batch))
+        loop = asyncio.get_running_loop()
+        try:
+            texts = await loop.run_in_executor(
+                self.service._executor, self.service.recognize_batch, [samples for samples, _ in batch]
+            )
+            for (_, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+        except asyncio.CancelledError:
+            self._fail(batch)
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            if threads is not None:
+                threads.release()
+
+    def close(self, cancel_running: bool = False):
+        """
+        停止收集任务，队列中剩余的请求按批提交；cancel_running=True 时（服务关闭）
+        剩余请求与正在执行的批次直接失败。可在任意线程调用（配置回调在监听线程中执行）。
+        """
+        self._closed = True
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._close(cancel_running)
+        else:
+            self._loop.call_soon_threadsafe(self._close, cancel_running)
+
+    @staticmethod
+    def _fail(batch: list):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(ASRError("ASR 服务已关闭"))
+
+    def _close(self, cancel_running: bool):
+        self._cancelled = cancel_running
+        if self._task:
+            self._task.cancel()
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if cancel_running:
+            self._fail(batch)
+            for task in list(self._running):
+                task.cancel()
+            return
+        for i in range(0, len(batch), max(1, self.max_size)):
+            self._dispatch(batch[i:i + self.max_size])
+
+
 class ASRService:
     """语音识别服务"""
-    def __init__(self):
-        """初始化 ASR 服务"""
-        self.ffmpeg = FFmpegProcessor()
+    def __init__(self, inference_processes: Optional[int] = None, load: bool = True):
+        """初始化 ASR 服务；load=False 时只创建对象，模型由 load() 另行加载"""
+        self.ffmpeg = FFmpegProcessor(check=False)
+        self.model = None
+        self.workers = None
+        self.inference_processes = (
+            settings.ASR_INFERENCE_PROCESSES if inference_processes is None else inference_processes
+        )
+        # 音频预处理与进程内推理都在线程池中执行，避免阻塞事件循环
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.ASR_EXECUTOR_WORKERS),
+            thread_name_prefix="asr"
+        )
+        self.batcher = None
+        if settings.ASR_BATCH_MAX_SIZE > 1:
+            self.batcher = RecognitionBatcher(
+                self, settings.ASR_BATCH_MAX_SIZE, settings.ASR_BATCH_WINDOW_MS, max(1, settings.ASR_EXECUTOR_WORKERS)
+            )
+        settings.subscribe(self._on_settings_change)
+        if load:
+            self.load()
+
+    def _on_settings_change(self, new, old):
+        if new.ASR_EXECUTOR_WORKERS != old.ASR_EXECUTOR_WORKERS:
+            # 新任务进入新线程池，旧线程池执行完已提交的任务后退出
+            previous = self._executor
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, new.ASR_EXECUTOR_WORKERS),
+                thread_name_prefix="asr"
+            )
+            previous.shutdown(wait=False)
+            logger.info(f"ASR线程池大小已调整为 {new.ASR_EXECUTOR_WORKERS}")
+        if self.workers:
+            self.workers.timeout = new.ASR_INFERENCE_TIMEOUT
+        if new.ASR_BATCH_MAX_SIZE > 1:
+            if self.batcher is None:
+                self.batcher = RecognitionBatcher(self, new.ASR_BATCH_MAX_SIZE, new.ASR_BATCH_WINDOW_MS)
+            self.batcher.max_size = new.ASR_BATCH_MAX_SIZE
+            self.batcher.window = new.ASR_BATCH_WINDOW_MS / 1000.0
+            self.batcher.concurrency = max(1, new.ASR_EXECUTOR_WORKERS)
+        elif self.batcher is not None:
+            # 已提交的请求照常处理完毕，新请求不再合并
+            self.batcher.close()
+            self.batcher = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None or self.workers is not None
+
+    def load(self):
+        """检查 FFmpeg 并加载模型（或启动推理进程池），重复调用无副作用"""
+        if self.loaded:
+            return
+        self.ffmpeg._check_ffmpeg()
+        if self.inference_processes > 0:
+            # 模型由独立推理进程加载，Web 进程不再持有模型
+            from services.asr_workers import ASRWorkerPool
+            bytes_per_second = settings.ASR_SAMPLE_RATE * self.ffmpeg.channels * self.ffmpeg.sample_width
+            self.workers = ASRWorkerPool(
+                processes=self.inference_processes,
+                ring_slots=settings.ASR_INFERENCE_RING_SLOTS,
+                slot_bytes=int(bytes_per_second * settings.ASR_INFERENCE_SLOT_SECONDS),
+                start_method=settings.ASR_INFERENCE_START_METHOD,
+                timeout=settings.ASR_INFERENCE_TIMEOUT,
+            )
+            return
 
         # 从配置管理器获取ASR配置
         asr_config = settings.ASR
         try:
+            from funasr import AutoModel
             self.model = AutoModel(
                 model=asr_config.get('model'),
                 disable_update=True,
                 vad_model=asr_config.get('vad_model'),
-                vad_kwargs=asr_config.get('vad_params'),
+                vad_kwargs=dict(asr_config.get('vad_params') or {}),
                 device=asr_config.get('device', 'cpu')
             )
             logger.info(f"ASR模型初始化成功: {asr_config.get('model')}")
         except Exception as e:
             raise ASRError(f"ASR 模型初始化失败: {str(e)}")
 
-    async def transcribe(self, audio_data: bytes, input_format: str = "opus") -> str:
-        """语音识别主流程"""
+    def freeze(self):
+        """冻结模型权重，供 fork 后的工作进程以写时复制方式共享"""
+        if self.model is None:
+            return
+        for name in ("model", "vad_model", "punc_model", "spk_model"):
+            module = getattr(self.model, name, None)
+            if module is None or not hasattr(module, "parameters"):
+                continue
+            module.eval()
+            for param in module.parameters():
+                param.requires_grad_(False)
+        logger.info("ASR模型权重已冻结")
+
+    async def warm_up(self, path: str = WARMUP_AUDIO) -> str:
+        """对样例音频执行一次完整识别，失败时抛出异常（transcribe 会吞掉异常）"""
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as f:
+            audio = f.read()
+        pcm = await loop.run_in_executor(self._executor, self.ffmpeg.process_pcm, audio)
+        if self.workers:
+            return await self.workers.submit(pcm)
+        return await loop.run_in_executor(self._executor, self.recognize, pcm_to_float(pcm))
+
+    async def open_stream(self, input_format: str = "auto"):
+        """为一次流式上传创建并启动解码器（input_format 见 INPUT_FORMATS）"""
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"不支持的音频格式: {input_format}")
+        if input_format == "opus":
+            decoder = OpusPacketDecoder(self.ffmpeg.target_sr, self.ffmpeg.channels)
+        else:
+            decoder = self.ffmpeg.open_stream(input_format)
+        await decoder.start()
+        return decoder
+
+    async def finish_stream(self, decoder) -> str:
+        """结束流式上传并识别；音频已在接收过程中解码，这里只剩解码尾部和模型推理"""
         try:
-            # 1. 音频预处理
-            processed_audio = self.ffmpeg.process_audio(audio_data, input_format)
+            with metrics.ASR_SECONDS.time():
+                with tracer.span("ffmpeg", input_bytes=decoder.bytes_received, streaming=True):
+                    with metrics.FFMPEG_SECONDS.time():
+                        pcm = await decoder.finish()
+                return await self._recognize_pcm(pcm)
+        except FFmpegError as e:
+            logger.error(f"音频处理失败: {str(e)}")
+            return f"音频处理失败: {str(e)}"
+        except Exception as e:
+            logger.error(f"语音识别失败: {str(e)}")
+            return f"语音识别失败: {str(e)}"
 
-            # 2. 保存临时文件
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(processed_audio)
-                temp_path = temp_file.name
+    async def _recognize_pcm(self, pcm: bytes) -> str:
+        if not pcm:
+            return "未能识别到有效语音，请重试"
+        return await self.recognize_pcm(pcm)
+
+    async def recognize_pcm(self, pcm: bytes) -> str:
+        """识别 16-bit PCM，失败时抛出异常；进程内推理时经批量合并"""
+        with tracer.span("asr.generate", pcm_bytes=len(pcm), workers=bool(self.workers)):
+            if self.workers:
+                with metrics.ASR_DECODE_SECONDS.time():
+                    return await self.workers.submit(pcm)
+            if self.batcher:
+                return await self.batcher.submit(pcm_to_float(pcm))
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.recognize, pcm_to_float(pcm))
+
+    async def decode(self, audio_data: bytes, input_format: str = "auto") -> bytes:
+        """将完整音频解码为 16-bit PCM，失败时抛出 FFmpegError"""
+        if input_format not in INPUT_FORMATS:
+            raise FFmpegError(f"不支持的音频格式: {input_format}")
+        with tracer.span("ffmpeg", input_bytes=len(audio_data), input_format=input_format):
+            loop = asyncio.get_running_loop()
+            if input_format == "opus":
+                return await loop.run_in_executor(self._executor, self._decode_opus, audio_data)
+            return await loop.run_in_executor(
+                self._executor, self.ffmpeg.process_pcm, audio_data, input_format
+            )
 
-            try:
-                # 3. 执行语音识别
-                result = self.model.generate(
-                    input=temp_path,
-                    cache={},
-                    hotword='甜甜',
-                    use_itn=True,
-                    language="auto",
-                    batch_size_s=60,
-                    merge_vad=True,
-                    merge_length_s=15,
-                )
-
-                if not result or len(result) == 0:
-                    return "未能识别到有效语音，请重试"
-
-                # 4. 后处理文本
-                text = result[0]['text']
-                return self._post_process_text(text)
-
-            finally:
-                # 清理临时文件
-                try:
-                    logger.info(f"清理临时文件: {temp_path}")
-                    Path(temp_path).unlink()
-                except Exception as e:
-                    logger.warning(f"清理临时文件失败: {str(e)}")
+    def _decode_opus(self, audio_data: bytes) -> bytes:
+        decoder = OpusPacketDecoder(self.ffmpeg.target_sr, self.ffmpeg.channels)
+        decoder.decode(audio_data)
+        return decoder.pcm
+
+    async def transcribe(self, audio_data: bytes, input_format: str = "auto") -> str:
+        """语音识别主流程（完整音频一次性上传）"""
+        try:
+            with metrics.ASR_SECONDS.time():
+                # 1. 音频预处理（内存中解码为 PCM）
+                pcm = await self.decode(audio_data, input_format)
+
+                # 2. 执行语音识别
+                return await self._recognize_pcm(pcm)
 
         except FFmpegError as e:
             logger.error(f"音频处理失败: {str(e)}")
@@ -159,12 +586,63 @@ class ASRService:
             logger.error(f"语音识别失败: {str(e)}")
             return f"语音识别失败: {str(e)}"
 
+    def recognize(self, samples: np.ndarray) -> str:
+        """对 16kHz float32 波形执行同步识别并后处理"""
+        with metrics.ASR_DECODE_SECONDS.time():
+            result = self.model.generate(
+                input=samples,
+                cache={},
+                hotword='甜甜',
+                use_itn=True,
+                language="auto",
+                batch_size_s=60,
+                merge_vad=True,
+                merge_length_s=15,
+            )
+
+        if not result or len(result) == 0:
+            return "未能识别到有效语音，请重试"
+
+        # 后处理文本
+        text = result[0]['text']
+        return self._post_process_text(text)
+
+    def recognize_batch(self, samples_list: List[np.ndarray]) -> List[str]:
+        """对多段波形执行一次批量识别，返回与输入一一对应的文本"""
+        if len(samples_list) == 1:
+            return [self.recognize(samples_list[0])]
+        with metrics.ASR_DECODE_SECONDS.time():
+            result = self.model.generate(
+                input=list(samples_list),
+                cache={},
+                hotword='甜甜',
+                use_itn=True,
+                language="auto",
+                batch_size_s=60,
+                merge_vad=True,
+                merge_length_s=15,
+            )
+        if not result or len(result) != len(samples_list):
+            # 批量结果无法与输入对应时逐条识别，保证正确性
+            logger.warning(f"批量识别结果数量不匹配（{len(result or [])}/{len(samples_list)}），改为逐条识别")
+            return [self.recognize(samples) for samples in samples_list]
+        return [self._post_process_text(item.get('text', '')) for item in result]
+
+    def close(self):
+        """释放线程池与推理进程"""
+        if self.batcher:
+            self.batcher.close(cancel_running=True)
+        if self.workers:
+            self.workers.close()
+        self._executor.shutdown(wait=False)
+
     def _post_process_text(self, text: str) -> str:
         """文本后处理"""
         if not text:
             return ""
 
         # 1. 使用 FunASR 的后处理
+        from funasr.utils.postprocess_utils import rich_transcription_postprocess
         text = rich_transcription_postprocess(text)
 
         # 2. 清理非中英文字符
@@ -209,6 +687,8 @@ class ASRService:
 
 
 if __name__ == "__main__":
+    from config.logging_setup import setup_logging
+    setup_logging()
     asr = ASRService()
     audio_file = "test/sample/sample-3s.wav"
     with open(audio_file, "rb") as f:
@@ -0,0 +1,222 @@
+import os
+import time
+import uuid
+import queue
+import asyncio
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from exceptions import ASRError
+
+logger = logging.getLogger(__name__)
+
+# 结果监听线程检查推理进程存活的间隔（秒）
+LIVENESS_INTERVAL = 1.0
+
+
+def _inference_worker(shm_name: str, jobs, results, current, threads: int):
+    """
+    推理进程入口：加载一次模型，循环处理共享内存中的音频。
+    取到任务后先把 job_id 同步写入共享的 current，进程异常退出时主进程据此让该任务立即失败
+    （结果队列经由后台线程发送，进程崩溃时可能来不及送出）。
+    """
+    if threads > 0:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from services.asr import ASRService, pcm_to_float
+
+    asr = ASRService(inference_processes=0)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    logger.info(f"ASR inference worker {os.getpid()} ready")
+
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            job_id, slot, offset, nbytes, inline = job
+            current.value = job_id.encode()
+            try:
+                if inline is not None:
+                    pcm = inline
+                else:
+                    pcm = shm.buf[offset:offset + nbytes]
+                # pcm_to_float 会复制数据，之后槽位即可被复用
+                samples = pcm_to_float(pcm)
+                del pcm
+                results.put((job_id, slot, asr.recognize(samples), None))
+            except Exception as e:
+                results.put((job_id, slot, None, str(e)))
+    finally:
+        shm.close()
+
+
+class ASRWorkerPool:
+    """独立推理进程池，音频通过共享内存环形缓冲区传递，结果以 future 返回"""
+
+    def __init__(self, processes: int, ring_slots: int, slot_bytes: int,
+                 start_method: str = "spawn", timeout: float = 120, threads: int = 0):
+        self.processes = processes
+        self.ring_slots = ring_slots
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(1, processes))
+        self._ctx = mp.get_context(start_method)
+        self._shm = shared_memory.SharedMemory(create=True, size=ring_slots * slot_bytes)
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._workers: List[mp.Process] = []
+        # 每个推理进程当前处理的 job_id（共享内存），按 pid 索引
+        self._current: Dict[int, mp.Array] = {}
+        self._pending: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future, int]] = {}
+        self._slot_owner: Dict[int, str] = {}
+        self._free_slots: Optional[asyncio.Queue] = None
+        self._listener = threading.Thread(target=self._listen, name="asr-result-listener", daemon=True)
+        self._workers_lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(processes):
+            self._spawn()
+        self._listener.start()
+        logger.info(
+            f"ASR worker pool started: processes={processes}, slots={ring_slots}, "
+            f"slot_bytes={slot_bytes}, threads_per_process={self.threads}"
+        )
+
+    def _spawn(self):
+        current = self._ctx.RawArray("c", 64)
+        process = self._ctx.Process(
+            target=_inference_worker,
+            args=(self._shm.name, self._jobs, self._results, current, self.threads),
+            daemon=True,
+        )
+        process.start()
+        self._workers.append(process)
+        self._current[process.pid] = current
+
+    def _check_workers(self):
+        """监听线程中调用：异常退出的推理进程上正在处理的任务立即失败，并补齐进程"""
+        with self._workers_lock:
+            dead = [p for p in self._workers if not p.is_alive()]
+            if not dead:
+                return
+            self._workers = [p for p in self._workers if p.is_alive()]
+            for process in dead:
+                logger.warning(f"ASR inference worker {process.pid} died (exit code {process.exitcode}), respawning")
+                job_id = self._current.pop(process.pid).value.decode()
+                # 该任务的结果若已送达，_pending 中已没有它，这里不会重复回填
+                if job_id:
+                    self._complete(job_id, None, f"推理进程异常退出（exit code {process.exitcode}）")
+            if not self._closed:
+                while len(self._workers) < self.processes:
+                    self._spawn()
+
+    def _listen(self):
+        """后台线程：接收推理结果并回填到对应的 future，同时定期检查推理进程是否存活"""
+        next_check = time.monotonic() + LIVENESS_INTERVAL
+        while True:
+            try:
+                item = self._results.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            except (EOFError, OSError):
+                break
+            if item is None:
+                break
+            if item:
+                job_id, _, text, error = item
+                self._complete(job_id, text, error)
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + LIVENESS_INTERVAL
+
+    def _complete(self, job_id: str, text: Optional[str], error: Optional[str]):
+        """回到提交任务的事件循环中回填结果并归还槽位；已超时的任务只归还槽位"""
+        pending = self._pending.pop(job_id, None)
+        if pending is None:
+            return
+        loop, future, slot = pending
+        try:
+            loop.call_soon_threadsafe(self._resolve, job_id, slot, future, text, error)
+        except RuntimeError:
+            # 事件循环已关闭（进程退出中），无需回填
+            pass
+
+    def _resolve(self, job_id: str, slot: int, future: asyncio.Future, text: Optional[str], error: Optional[str]):
+        self._release_slot(slot, job_id)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(ASRError(error))
+        else:
+            future.set_result(text)
+
+    def _release_slot(self, slot: int, job_id: str):
+        if slot >= 0 and self._slot_owner.get(slot) == job_id:
+            del self._slot_owner[slot]
+            self._free_slots.put_nowait(slot)
+
+    async def submit(self, pcm: bytes) -> str:
+        """提交 16-bit PCM 音频，等待推理进程返回识别文本"""
+        if self._closed:
+            raise ASRError("ASR 推理进程池已关闭")
+        if self._free_slots is None:
+            self._free_slots = asyncio.Queue()
+            for slot in range(self.ring_slots):
+                self._free_slots.put_nowait(slot)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = uuid.uuid4().hex
+        nbytes = len(pcm)
+        # 等待空闲槽位的时间同样计入超时：超时任务会一直占用槽位，推理进程卡住时槽位可能全部耗尽
+        deadline = loop.time() + self.timeout
+
+        if nbytes <= self.slot_bytes:
+            try:
+                slot = await asyncio.wait_for(self._free_slots.get(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise ASRError(f"语音识别超时（{self.timeout}s 内没有空闲的共享内存槽位）")
+            offset = slot * self.slot_bytes
+            self._shm.buf[offset:offset + nbytes] = pcm
+            self._slot_owner[slot] = job_id
+            job = (job_id, slot, offset, nbytes, None)
+        else:
+            logger.warning(f"Audio of {nbytes} bytes exceeds shared memory slot, sending inline")
+            slot = -1
+            job = (job_id, slot, 0, nbytes, bytes(pcm))
+
+        self._pending[job_id] = (loop, future, slot)
+        self._jobs.put(job)
+        try:
+            return await asyncio.wait_for(future, timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            # 推理进程可能仍会读取该槽位：保留 _pending 和槽位占用，
+            # 迟到的结果到达（或进程退出）时再由 _complete 归还
+            raise ASRError(f"语音识别超时（{self.timeout}s）")
+
+    def close(self):
+        """停止推理进程并释放共享内存"""
+        with self._workers_lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._workers:
+            self._jobs.put(None)
+        for process in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._listener.join(timeout=5)
+        self._shm.close()
+        self._shm.unlink()
+        logger.info("ASR worker pool closed")
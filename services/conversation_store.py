@@ -0,0 +1,138 @@
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """对话历史存储接口，按会话 ID 隔离"""
+
+    async def load(self, session_id: str) -> List[Dict[str, str]]:
+        """读取会话的对话历史"""
+        raise NotImplementedError
+
+    async def save(self, session_id: str, messages: List[Dict[str, str]]):
+        """写回会话的对话历史"""
+        raise NotImplementedError
+
+    async def clear(self, session_id: str):
+        """清除会话的对话历史"""
+        raise NotImplementedError
+
+    async def ping(self):
+        """检查存储是否可用，不可用时抛出异常"""
+        pass
+
+    async def close(self):
+        """释放存储占用的资源"""
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    进程内对话历史存储
+
+    与 Redis 后端使用相同的 ttl：超过 ttl 秒未读写的会话在下次访问存储时淘汰；
+    max_sessions 限制保留的会话数，超出时淘汰最久未访问的会话（0 为不限制）。
+    """
+
+    def __init__(self, ttl: int = 0, max_sessions: int = 0):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # session_id -> (最后访问时间, 对话历史)，按最后访问时间排序
+        self._histories: "OrderedDict[str, Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+
+    def _evict(self, now: float):
+        if self.ttl > 0:
+            while self._histories:
+                session_id, (touched, _) = next(iter(self._histories.items()))
+                if now - touched <= self.ttl:
+                    break
+                del self._histories[session_id]
+        if self.max_sessions > 0:
+            while len(self._histories) > self.max_sessions:
+                self._histories.popitem(last=False)
+
+    async def load(self, session_id: str) -> List[Dict[str, str]]:
+        now = time.monotonic()
+        self._evict(now)
+        item = self._histories.get(session_id)
+        if item is None:
+            return []
+        self._histories[session_id] = (now, item[1])
+        self._histories.move_to_end(session_id)
+        return list(item[1])
+
+    async def save(self, session_id: str, messages: List[Dict[str, str]]):
+        now = time.monotonic()
+        self._histories[session_id] = (now, list(messages))
+        self._histories.move_to_end(session_id)
+        self._evict(now)
+
+    async def clear(self, session_id: str):
+        self._histories.pop(session_id, None)
+
+
+class RedisConversationStore(ConversationStore):
+    """Redis 兼容的网络对话历史存储，可在多个工作进程/节点之间共享"""
+
+    def __init__(self, url: str, key_prefix: str = "tiantian:session:", ttl: int = 3600):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("使用 redis 会话存储需要安装 redis 包: pip install redis")
+        self.url = url
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self._client = aioredis.from_url(url, decode_responses=True)
+        logger.info(f"Redis conversation store initialized: {url}")
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    async def load(self, session_id: str) -> List[Dict[str, str]]:
+        raw = await self._client.get(self._key(session_id))
+        if not raw:
+            return []
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"Corrupted conversation history for {session_id}, ignoring")
+            return []
+
+    async def save(self, session_id: str, messages: List[Dict[str, str]]):
+        payload = json.dumps(messages, ensure_ascii=False)
+        if self.ttl > 0:
+            await self._client.set(self._key(session_id), payload, ex=self.ttl)
+        else:
+            await self._client.set(self._key(session_id), payload)
+
+    async def clear(self, session_id: str):
+        await self._client.delete(self._key(session_id))
+
+    async def ping(self):
+        await self._client.ping()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_conversation_store() -> ConversationStore:
+    """根据配置创建对话历史存储"""
+    backend = settings.SESSION_STORE_BACKEND
+    if backend == "redis":
+        return RedisConversationStore(
+            settings.SESSION_STORE_URL,
+            key_prefix=settings.SESSION_STORE_KEY_PREFIX,
+            ttl=settings.SESSION_STORE_TTL,
+        )
+    if backend != "memory":
+        logger.warning(f"Unknown session store backend '{backend}', falling back to memory")
+    return InMemoryConversationStore(
+        ttl=settings.SESSION_STORE_TTL,
+        max_sessions=settings.SESSION_STORE_MAX_SESSIONS,
+    )
@@ -0,0 +1,81 @@
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionGovernor:
+    """连接治理：会话数上限、排队轮次上限以及空闲/无响应会话回收"""
+
+    def __init__(self):
+        self._apply_settings(settings.snapshot)
+        settings.subscribe(self._on_settings_change)
+        self.pending_turns = 0
+        self.rejected_sessions = 0
+        self.rejected_turns = 0
+        logger.info(
+            f"ConnectionGovernor initialized: max_sessions={self.max_sessions}, "
+            f"max_pending_turns={self.max_pending_turns}, idle_timeout={self.idle_timeout}s"
+        )
+
+    def _apply_settings(self, s):
+        self.max_sessions = s.WS_MAX_SESSIONS
+        self.max_pending_turns = s.WS_MAX_PENDING_TURNS
+        self.idle_timeout = s.WS_IDLE_TIMEOUT
+        self.reap_interval = s.WS_REAP_INTERVAL
+        self.ping_interval = s.WS_PING_INTERVAL
+        self.pong_timeout = s.WS_PING_TIMEOUT
+        self.busy_close_code = s.WS_BUSY_CLOSE_CODE
+        self.reap_close_code = s.WS_REAP_CLOSE_CODE
+        self.restart_close_code = s.WS_RESTART_CLOSE_CODE
+
+    def _on_settings_change(self, new, old):
+        self._apply_settings(new)
+        if new.WEBSOCKET != old.WEBSOCKET:
+            logger.info(
+                f"ConnectionGovernor updated: max_sessions={self.max_sessions}, "
+                f"max_pending_turns={self.max_pending_turns}, idle_timeout={self.idle_timeout}s"
+            )
+
+    def admit_session(self, active_sessions: int) -> bool:
+        """判断是否允许建立新会话"""
+        if self.max_sessions > 0 and active_sessions >= self.max_sessions:
+            self.rejected_sessions += 1
+            metrics.SESSIONS_REJECTED.inc()
+            logger.warning(f"Session rejected: {active_sessions}/{self.max_sessions} sessions active")
+            return False
+        return True
+
+    def acquire_turn(self) -> bool:
+        """为新的对话轮次占用排队名额，名额不足时返回 False"""
+        if self.max_pending_turns > 0 and self.pending_turns >= self.max_pending_turns:
+            self.rejected_turns += 1
+            metrics.TURNS_REJECTED.inc()
+            logger.warning(f"Turn rejected: {self.pending_turns}/{self.max_pending_turns} turns pending")
+            return False
+        self.pending_turns += 1
+        metrics.PENDING_TURNS.set(self.pending_turns)
+        return True
+
+    def release_turn(self):
+        """释放排队名额"""
+        if self.pending_turns > 0:
+            self.pending_turns -= 1
+        metrics.PENDING_TURNS.set(self.pending_turns)
+
+    def find_expired(self, states: Dict, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """找出需要回收的会话，返回 (client_id, 原因) 列表"""
+        now = now if now is not None else time.time()
+        expired = []
+        for client_id, state in states.items():
+            # 有进行中的轮次（处理中、排队中或流式上传中）时不回收，与排空的判断一致
+            if state.busy:
+                continue
+            if self.idle_timeout > 0 and now - state.last_interaction_time > self.idle_timeout:
+                expired.append((client_id, "idle"))
+            elif now - state.last_pong_time > self.ping_interval + self.pong_timeout:
+                expired.append((client_id, "unresponsive"))
+        return expired
@@ -0,0 +1,107 @@
+"""
+服务健康状态
+
+- 存活（live）：进程和事件循环能够响应请求
+- 就绪（ready）：所有注册的服务都已加载完成并通过预热
+- 能力（capability）：一组服务都就绪时即可提供的功能，例如文本对话不必等待 ASR 模型加载
+- 排空（draining）：进程即将退出，不再接收新会话，就绪检查返回失败
+"""
+import time
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ServiceStatus:
+    """单个服务的加载状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        result = {"state": self.state}
+        if self.load_seconds is not None:
+            result["load_seconds"] = round(self.load_seconds, 3)
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+class HealthRegistry:
+    """汇总各服务状态，供 /health/ready 使用"""
+
+    def __init__(self):
+        self.services: Dict[str, ServiceStatus] = {}
+        self.capabilities: Dict[str, Tuple[str, ...]] = {}
+        self.started_at = time.time()
+        self.draining = False
+
+    def register(self, name: str) -> ServiceStatus:
+        return self.services.setdefault(name, ServiceStatus(name))
+
+    def register_capability(self, name: str, services: Sequence[str]):
+        """声明一项能力依赖的服务"""
+        for service in services:
+            self.register(service)
+        self.capabilities[name] = tuple(services)
+
+    def mark_loading(self, name: str):
+        status = self.register(name)
+        status.state = LOADING
+        status.error = None
+        status.started_at = time.perf_counter()
+
+    def mark_ready(self, name: str):
+        status = self.register(name)
+        status.state = READY
+        if status.started_at is not None:
+            status.load_seconds = time.perf_counter() - status.started_at
+        logger.info(f"Service ready: {name}")
+
+    def mark_failed(self, name: str, error: str):
+        status = self.register(name)
+        status.state = FAILED
+        status.error = error
+        logger.error(f"Service failed to load: {name}: {error}")
+
+    def start_draining(self):
+        self.draining = True
+        logger.info("Draining: readiness now reports not ready")
+
+    @property
+    def ready(self) -> bool:
+        if self.draining:
+            return False
+        return bool(self.services) and all(s.state == READY for s in self.services.values())
+
+    def capable(self, name: str) -> bool:
+        """能力依赖的服务是否都已就绪（排空中视为不可用）"""
+        services = self.capabilities.get(name)
+        if self.draining or services is None:
+            return False
+        return all(self.services[service].state == READY for service in services)
+
+    def snapshot(self) -> Dict:
+        if self.draining:
+            status = "draining"
+        else:
+            status = "ready" if self.ready else "not_ready"
+        return {
+            "status": status,
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "services": {name: status.to_dict() for name, status in self.services.items()},
+            "capabilities": {name: self.capable(name) for name in self.capabilities},
+        }
+
+
+health = HealthRegistry()
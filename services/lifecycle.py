@@ -0,0 +1,60 @@
+"""
+进程退出前的优雅排空
+
+uvicorn 收到 SIGTERM 后会立即向所有 WebSocket 发送关闭帧（1012），进行中的轮次全部中断，
+lifespan 的关闭阶段此时才开始执行，已经来不及排空。这里在 uvicorn 的信号处理之前插入排空：
+第一次 SIGTERM 先执行 drain()，完成（或超时）后再交给 uvicorn 正常关闭；
+排空期间再次收到 SIGTERM 则不再等待，直接交给 uvicorn。
+"""
+import signal
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DrainOnSignal:
+    """拦截 SIGTERM：先排空，再调用原来的信号处理函数"""
+
+    def __init__(self, drain: Callable[[], Awaitable[None]]):
+        self.drain = drain
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous = None
+        self._started = False
+
+    def install(self) -> bool:
+        """在事件循环中调用；信号处理只能在主线程注册，其他线程（如测试客户端）中不生效"""
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._previous = signal.signal(signal.SIGTERM, self._handle)
+        return True
+
+    def _handle(self, signum, frame):
+        if self._started:
+            logger.warning("Received SIGTERM again while draining, shutting down now")
+            self._forward()
+            return
+        self._started = True
+        logger.info("Received SIGTERM, draining before shutdown")
+        self._loop.call_soon_threadsafe(self._start)
+
+    def _start(self):
+        task = self._loop.create_task(self.drain(), name="drain")
+        task.add_done_callback(self._on_drained)
+
+    def _on_drained(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Drain failed: {task.exception()}")
+        self._forward()
+
+    def _forward(self):
+        previous = self._previous
+        if callable(previous):
+            previous(signal.SIGTERM, None)
+        else:
+            # 没有其他处理函数时按默认行为退出
+            signal.signal(signal.SIGTERM, previous or signal.SIG_DFL)
+            signal.raise_signal(signal.SIGTERM)
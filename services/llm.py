@@ -1,31 +1,47 @@
 import json
+import time
 import logging
 import aiohttp
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+from exceptions import LLMError
 from config.settings import settings
+from services.conversation_store import ConversationStore, InMemoryConversationStore
+from services import metrics
+from services.tracing import tracer
 
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_SESSION_ID = "default"
+
+
 class LLMService:
-    def __init__(self):
-        # 从配置管理器获取配置
-        self.api_url = settings.LLM_API_BASE
-        self.api_key = settings.LLM_API_KEY
-        self.max_context_length = settings.LLM_MAX_CONTEXT_LENGTH
-        self.temperature = settings.LLM_TEMPERATURE
-        self.model = settings.LLM_MODEL
-        self.conversation_history: List[Dict[str, str]] = []
+    def __init__(self, store: Optional[ConversationStore] = None):
+        # 从配置管理器获取配置，配置热加载后自动更新
+        self._apply_settings(settings.snapshot)
+        settings.subscribe(self._on_settings_change)
+        # 对话历史按会话隔离，存储后端可替换
+        self.store: ConversationStore = store or InMemoryConversationStore(
+            ttl=settings.SESSION_STORE_TTL, max_sessions=settings.SESSION_STORE_MAX_SESSIONS
+        )
         logger.info("LLM service initialized with configuration:")
         logger.info(f"API URL: {self.api_url}")
         logger.info(f"Model: {self.model}")
         logger.info(f"Max context length: {self.max_context_length}")
         logger.info(f"Temperature: {self.temperature}")
 
-    async def get_response(self, user_input: str) -> str:
+    def _apply_settings(self, s):
+        self.api_url = s.LLM_API_BASE
+        self.api_key = s.LLM_API_KEY
+        self.max_context_length = s.LLM_MAX_CONTEXT_LENGTH
+        self.temperature = s.LLM_TEMPERATURE
+        self.model = s.LLM_MODEL
+
+    def _on_settings_change(self, new, old):
+        self._apply_settings(new)
+
+    async def get_response(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
         """ 获取LLM的响应"""
         if not user_input or not user_input.strip():
             logger.warning("Empty user input received")
@@ -34,11 +50,12 @@ class LLMService:
         try:
             logger.info(f"Processing user input: {user_input[:100]}...")  # 只记录前100个字符
 
-            # 更新对话历史
-            self.conversation_history.append({"role": "user", "content": user_input})
-            if len(self.conversation_history) > self.max_context_length:
-                self.conversation_history = self.conversation_history[-self.max_context_length:]
-                logger.info(f"Conversation history trimmed to {self.max_context_length} messages")
+            # 更新对话历史（仅包含当前会话）
+            history = await self.store.load(session_id)
+            history.append({"role": "user", "content": user_input})
+            if len(history) > self.max_context_length:
+                history = history[-self.max_context_length:]
+                logger.info(f"Conversation history for {session_id} trimmed to {self.max_context_length} messages")
 
             # 准备请求数据
             headers = {
@@ -48,38 +65,47 @@ class LLMService:
 
             data = {
                 "model": self.model,
-                "messages": self.conversation_history,
+                "messages": history,
                 "temperature": self.temperature,
             }
 
-            logger.info("Sending request to LLM API")
+            logger.debug("Sending request to LLM API")
             # 发送请求
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, headers=headers, json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if "choices" not in result or not result["choices"]:
-                            logger.error(f"Invalid response format: {result}")
-                            return "抱歉，我遇到了一些问题，请重试。"
+            start = time.perf_counter()
+            with tracer.span("llm.request", model=self.model, messages=len(history)) as span:
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(self.api_url, headers=headers, json=data) as response:
+                        metrics.LLM_RESPONSE_HEADERS_SECONDS.observe(time.perf_counter() - start)
+                        if span:
+                            span.set_attribute("status", response.status)
+                        metrics.LLM_REQUESTS.labels(response.status).inc()
+                        if response.status == 200:
+                            result = await response.json()
+                            metrics.LLM_SECONDS.observe(time.perf_counter() - start)
+                            if "choices" not in result or not result["choices"]:
+                                logger.error(f"Invalid response format: {result}")
+                                return "抱歉，我遇到了一些问题，请重试。"
                             
-                        assistant_response = result["choices"][0]["message"]["content"]
-                        logger.info(f"Received response: {assistant_response[:100]}...")  # 只记录前100个字符
+                            assistant_response = result["choices"][0]["message"]["content"]
+                            logger.info(f"Received response: {assistant_response[:100]}...")  # 只记录前100个字符
                         
-                        # 更新对话历史
-                        self.conversation_history.append({"role": "assistant", "content": assistant_response})
+                            # 更新对话历史
+                            history.append({"role": "assistant", "content": assistant_response})
+                            await self.store.save(session_id, history)
                         
-                        return assistant_response
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"LLM API error: Status {response.status}, Response: {error_text}")
-                        if response.status == 401:
-                            return "抱歉，API认证失败，请检查配置。"
-                        elif response.status == 429:
-                            return "抱歉，请求过于频繁，请稍后再试。"
+                            return assistant_response
                         else:
-                            return f"抱歉，我遇到了一些问题（错误码：{response.status}），请重试。"
+                            error_text = await response.text()
+                            logger.error(f"LLM API error: Status {response.status}, Response: {error_text}")
+                            if response.status == 401:
+                                return "抱歉，API认证失败，请检查配置。"
+                            elif response.status == 429:
+                                return "抱歉，请求过于频繁，请稍后再试。"
+                            else:
+                                return f"抱歉，我遇到了一些问题（错误码：{response.status}），请重试。"
 
         except aiohttp.ClientError as e:
+            metrics.LLM_REQUESTS.labels("network_error").inc()
             logger.error(f"Network error while calling LLM API: {str(e)}")
             return "抱歉，网络连接出现问题，请检查网络后重试。"
         except json.JSONDecodeError as e:
@@ -89,11 +115,71 @@ class LLMService:
             logger.error(f"Unexpected error while getting LLM response: {str(e)}")
             return "抱歉，我遇到了一些意外的问题，请重试。"
 
-    async def generate(self, text: str) -> str:
+    async def stream(self, user_input: str, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """流式获取LLM响应，逐段产出文本；session_id 为 None 时不读写对话历史，失败时抛出 LLMError"""
+        if not user_input or not user_input.strip():
+            raise LLMError("输入文本不能为空")
+
+        history = await self.store.load(session_id) if session_id else []
+        history.append({"role": "user", "content": user_input})
+        if len(history) > self.max_context_length:
+            history = history[-self.max_context_length:]
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        data = {
+            "model": self.model,
+            "messages": history,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+
+        start = time.perf_counter()
+        parts: List[str] = []
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.api_url, headers=headers, json=data) as response:
+                    metrics.LLM_REQUESTS.labels(response.status).inc()
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"LLM API error: Status {response.status}, Response: {error_text}")
+                        raise LLMError(f"LLM API error: Status {response.status}")
+
+                    # SSE：每行 "data: {...}"，以 "data: [DONE]" 结束
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            break
+                        choices = json.loads(payload).get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            if not parts:
+                                metrics.LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                            parts.append(delta)
+                            yield delta
+        except aiohttp.ClientError as e:
+            metrics.LLM_REQUESTS.labels("network_error").inc()
+            logger.error(f"Network error while calling LLM API: {str(e)}")
+            raise LLMError(f"网络连接出现问题: {str(e)}")
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse LLM stream chunk: {str(e)}")
+            raise LLMError("服务器响应格式错误")
+
+        metrics.LLM_SECONDS.observe(time.perf_counter() - start)
+        if session_id:
+            history.append({"role": "assistant", "content": "".join(parts)})
+            await self.store.save(session_id, history)
+
+    async def generate(self, text: str, session_id: str = DEFAULT_SESSION_ID) -> str:
         """生成文本响应的别名方法"""
-        return await self.get_response(text)
+        return await self.get_response(text, session_id)
 
-    def clear_history(self):
+    async def clear_history(self, session_id: str = DEFAULT_SESSION_ID):
         """清除对话历史"""
-        self.conversation_history = []
-        logger.info("Conversation history cleared")
\ No newline at end of file
+        await self.store.clear(session_id)
+        logger.info(f"Conversation history cleared for {session_id}")
@@ -0,0 +1,247 @@
+"""
+轻量级指标子系统，输出 Prometheus 文本格式
+
+关闭时所有指标操作直接返回，开销可以忽略。每个进程独立统计，
+多进程部署时由 Prometheus 分别抓取各个工作进程或按实例聚合。
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+from config.settings import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry or REGISTRY
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._registry.register(self)
+
+    def labels(self, *values: str) -> "_Metric":
+        """按标签值获取子指标"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child._lock = threading.Lock()
+        child._children = {}
+        child._reset()
+        return child
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _child_samples(self, labels: Tuple[str, ...]) -> List[str]:
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        if not self.labelnames:
+            return self._child_samples(())
+        lines = []
+        for key, child in list(self._children.items()):
+            lines.extend(child._child_samples(key))
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset()
+
+    def _reset(self):
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+    def _child_samples(self, labels: Tuple[str, ...]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(self._value)}"]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset()
+
+    def _reset(self):
+        self._value = 0.0
+
+    def set(self, value: float):
+        if not self._registry.enabled:
+            return
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def _child_samples(self, labels: Tuple[str, ...]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(self._value)}"]
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """耗时分布直方图"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[MetricsRegistry] = None):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+        self._reset()
+
+    def _reset(self):
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+
+    def time(self):
+        """计时上下文管理器，关闭时返回空操作"""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return self._timer()
+
+    @contextmanager
+    def _timer(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _child_samples(self, labels: Tuple[str, ...]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            label_str = _format_labels(self.labelnames, labels, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+        base = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{base} {_format_value(self._sum)}")
+        lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+REGISTRY = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# 会话与排队
+ACTIVE_SESSIONS = Gauge("tiantian_active_sessions", "当前活跃的 WebSocket 会话数")
+PENDING_TURNS = Gauge("tiantian_pending_turns", "排队中的对话轮次数")
+SESSIONS_REJECTED = Counter("tiantian_sessions_rejected_total", "因过载被拒绝的会话数")
+SESSIONS_REAPED = Counter("tiantian_sessions_reaped_total", "被回收的会话数", ["reason"])
+TURNS_REJECTED = Counter("tiantian_turns_rejected_total", "因排队已满被拒绝的轮次数")
+TURNS = Counter("tiantian_turns_total", "处理完成的对话轮次数")
+TURN_ERRORS = Counter("tiantian_turn_errors_total", "对话轮次处理失败次数", ["stage"])
+AUDIO_BYTES_RECEIVED = Counter("tiantian_audio_bytes_received_total", "接收到的上行音频字节数")
+QUEUE_WAIT_SECONDS = Histogram("tiantian_queue_wait_seconds", "轮次在 task_queue 中的等待时间")
+
+# 各阶段耗时
+FFMPEG_SECONDS = Histogram("tiantian_ffmpeg_seconds", "FFmpeg 音频解码耗时")
+ASR_DECODE_SECONDS = Histogram("tiantian_asr_decode_seconds", "ASR 模型推理耗时")
+ASR_BATCH_SIZE = Histogram(
+    "tiantian_asr_batch_size", "单次批量推理合并的识别请求数", buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+ASR_SECONDS = Histogram("tiantian_asr_seconds", "语音识别总耗时（含预处理）")
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "tiantian_llm_first_token_seconds",
+    "流式 LLM 请求（POST /llm stream=true）到首个 token 的耗时；WebSocket 对话使用非流式请求，不计入此项",
+)
+LLM_RESPONSE_HEADERS_SECONDS = Histogram(
+    "tiantian_llm_response_headers_seconds", "非流式 LLM 请求到收到响应头的耗时"
+)
+LLM_SECONDS = Histogram("tiantian_llm_seconds", "LLM 请求总耗时")
+LLM_REQUESTS = Counter("tiantian_llm_requests_total", "LLM 请求数", ["status"])
+TTS_SECONDS = Histogram("tiantian_tts_synthesis_seconds", "TTS 合成耗时")
+TIME_TO_FIRST_AUDIO_SECONDS = Histogram(
+    "tiantian_time_to_first_audio_seconds", "轮次入队到首个音频分块发出的耗时"
+)
+TURN_SECONDS = Histogram("tiantian_turn_seconds", "轮次入队到最后一个音频分块发出的耗时")
+
+
+def render() -> str:
+    """导出全部指标"""
+    return REGISTRY.render()
@@ -0,0 +1,268 @@
+"""
+在线性能剖析工具
+
+- SamplingProfiler: 周期性采样所有线程（事件循环与执行器线程）的调用栈，输出折叠栈
+  （collapsed stacks，可直接作为 flamegraph.pl / speedscope 输入）
+- CProfileSession: 对事件循环线程执行 cProfile，输出 pstats 文本
+- LoopLagMonitor: 持续测量事件循环延迟；循环被阻塞超过阈值时由看门狗线程抓取事件循环线程
+  的调用栈，自动定位类似同步 model.generate 这类阻塞调用
+"""
+import io
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import logging
+import threading
+import traceback
+from collections import Counter as CounterDict, deque
+from typing import Dict, List, Optional
+from services import metrics
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_SECONDS = metrics.Histogram(
+    "tiantian_event_loop_lag_seconds", "事件循环调度延迟",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = metrics.Counter("tiantian_event_loop_blocked_total", "事件循环阻塞超过阈值的次数")
+
+
+def _frame_stack(frame) -> List[str]:
+    """从栈顶帧构造自底向上的函数名列表"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """基于 sys._current_frames 的采样剖析器，覆盖所有 Python 线程"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: CounterDict = CounterDict()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = [names.get(thread_id, str(thread_id))] + _frame_stack(frame)
+                self.samples[";".join(stack)] += 1
+            self.sample_count += 1
+
+    def stop(self) -> str:
+        """停止采样并返回折叠栈文本"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.time()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+class CProfileSession:
+    """事件循环线程上的 cProfile 会话（cProfile 只能剖析启用它的线程）"""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self.started_at: Optional[float] = None
+        self.running = False
+
+    def start(self):
+        self.started_at = time.time()
+        self._profile.enable()
+        self.running = True
+
+    def stop(self, sort: str = "cumulative", limit: int = 100) -> str:
+        self._profile.disable()
+        self.running = False
+        output = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+class ProfilerController:
+    """管理同一时间只允许一个的剖析会话"""
+
+    def __init__(self):
+        self.session = None
+        self.mode: Optional[str] = None
+        self._auto_stop: Optional[asyncio.TimerHandle] = None
+        self.last_result: Optional[str] = None
+
+    def start(self, mode: str = "sample", interval_ms: float = 5, seconds: float = 0) -> Dict:
+        if self.session is not None:
+            raise RuntimeError(f"已有 {self.mode} 剖析在运行")
+        if mode == "sample":
+            self.session = SamplingProfiler(interval=interval_ms / 1000.0)
+        elif mode == "cprofile":
+            self.session = CProfileSession()
+        else:
+            raise ValueError(f"未知的剖析模式: {mode}")
+        self.mode = mode
+        self.session.start()
+        if seconds > 0:
+            self._auto_stop = asyncio.get_running_loop().call_later(seconds, self.stop)
+        logger.info(f"Profiler started: mode={mode}, seconds={seconds or 'manual'}")
+        return {"mode": mode, "started_at": self.session.started_at}
+
+    def stop(self) -> str:
+        if self.session is None:
+            raise RuntimeError("没有正在运行的剖析")
+        if self._auto_stop:
+            self._auto_stop.cancel()
+            self._auto_stop = None
+        self.last_result = self.session.stop()
+        logger.info(f"Profiler stopped: mode={self.mode}")
+        self.session = None
+        self.mode = None
+        return self.last_result
+
+    async def profile_for(self, seconds: float, mode: str = "sample", interval_ms: float = 5) -> str:
+        self.start(mode, interval_ms)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # 客户端断开导致请求被取消时也要停止剖析，否则采样线程会一直运行、之后也无法再次启动
+            result = self.stop()
+        return result
+
+
+def dump_tasks(limit: int = 20) -> List[Dict]:
+    """导出当前事件循环中所有 asyncio 任务的调用栈"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        frames = task.get_stack(limit=limit)
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "done": task.done(),
+            "stack": [
+                f"{f.f_code.co_filename}:{f.f_lineno} in {f.f_code.co_name}" for f in frames
+            ],
+        })
+    tasks.sort(key=lambda t: t["name"])
+    return tasks
+
+
+class LoopLagMonitor:
+    """事件循环延迟监控与阻塞检测"""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2, history: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked_events: deque = deque(maxlen=history)
+        self._lags: deque = deque(maxlen=600)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop lag monitor started (interval={self.interval}s, threshold={self.threshold}s)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lags.append(lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        """看门狗：心跳超时说明事件循环被阻塞，抓取事件循环线程的调用栈"""
+        reported_heartbeat = None
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.threshold or reported_heartbeat == self._heartbeat:
+                continue
+            reported_heartbeat = self._heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.blocked_events.append({
+                "time": time.time(),
+                "blocked_s": round(stalled, 3),
+                "stack": stack,
+            })
+            EVENT_LOOP_BLOCKED.inc()
+            logger.warning(f"Event loop blocked for {stalled:.3f}s, stack:\n{stack}")
+
+    def stats(self) -> Dict:
+        lags = sorted(self._lags)
+
+        def pct(p: float) -> float:
+            return lags[min(len(lags) - 1, int(p * len(lags)))] if lags else 0.0
+
+        return {
+            "interval_s": self.interval,
+            "threshold_s": self.threshold,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "p50_lag_ms": round(pct(0.5) * 1000, 3),
+            "p99_lag_ms": round(pct(0.99) * 1000, 3),
+            "blocked_events": list(self.blocked_events),
+        }
+
+
+profiler = ProfilerController()
+loop_monitor = LoopLagMonitor(interval=settings.LOOP_LAG_INTERVAL, threshold=settings.LOOP_LAG_THRESHOLD)
+
+
+def _on_settings_change(new, old):
+    loop_monitor.interval = new.LOOP_LAG_INTERVAL
+    loop_monitor.threshold = new.LOOP_LAG_THRESHOLD
+
+
+settings.subscribe(_on_settings_change)
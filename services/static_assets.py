@@ -0,0 +1,194 @@
+"""
+前端静态资源
+
+启动时读取页面并预先压缩（gzip，安装了 brotli 时同时生成 br），之后直接从内存返回：
+- 每种编码有独立的强 ETag，If-None-Match 命中时返回 304
+- 按 Accept-Encoding 选择编码，响应带 Vary: Accept-Encoding
+- 文件变化（按 check_interval 节流检查 mtime/大小）或配置中的路径变化时在线程池中重新加载，
+  加载期间继续返回旧版本，压缩不会占用事件循环
+"""
+import os
+import gzip
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from config.settings import settings
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IDENTITY = "identity"
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 编码 -> q 值（无法解析的 q 值按 0 处理）"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(max(float(value.strip()), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class _Variant:
+    def __init__(self, body: bytes, etag: str, encoding: str):
+        self.body = body
+        self.etag = etag
+        self.encoding = encoding
+
+
+class StaticAsset:
+    """单个预压缩、常驻内存的静态文件"""
+
+    def __init__(self, path: str, media_type: str, cache_control: str = "no-cache",
+                 min_compress_bytes: int = 256, check_interval: float = 1.0):
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.min_compress_bytes = min_compress_bytes
+        self.check_interval = check_interval
+        self.variants: Dict[str, _Variant] = {}
+        self._stat: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._reloading = False
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        """读取并压缩文件；整体替换 variants，读取方不会看到半成品"""
+        stat = self._file_stat()
+        try:
+            with open(self.path, "rb") as f:
+                body = f.read()
+        except OSError as e:
+            logger.error(f"Failed to load static asset {self.path}: {str(e)}")
+            self.variants = {}
+            self._stat = stat
+            return
+
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {IDENTITY: _Variant(body, f'"{digest}"', IDENTITY)}
+        if len(body) >= self.min_compress_bytes:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                variants["gzip"] = _Variant(gz, f'"{digest}-gz"', "gzip")
+            if brotli is not None:
+                br = brotli.compress(body, quality=11, mode=brotli.MODE_TEXT)
+                if len(br) < len(body):
+                    variants["br"] = _Variant(br, f'"{digest}-br"', "br")
+        self.variants = variants
+        self._stat = stat
+        sizes = ", ".join(f"{name}={len(v.body)}" for name, v in variants.items())
+        logger.info(f"Loaded static asset {self.path} ({sizes})")
+
+    async def refresh(self):
+        """节流检查文件是否变化，变化时在线程池中重新加载"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._reloading or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self._file_stat() == self._stat:
+            return
+        self._reloading = True
+        try:
+            await loop.run_in_executor(None, self.load)
+        finally:
+            self._reloading = False
+
+    def _select(self, accept_encoding: str) -> Optional[_Variant]:
+        """按 q 值选择编码，q 相同时优先体积更小的；客户端拒绝所有可用编码时返回 None"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*")
+        best, best_q = None, 0.0
+        for encoding in ("br", "gzip", IDENTITY):
+            if encoding not in self.variants:
+                continue
+            if encoding in accepted:
+                q = accepted[encoding]
+            elif wildcard is not None:
+                q = wildcard
+            else:
+                # 未列出的压缩编码不可用；未列出的 identity 仍可用，但只在没有其他可用编码时选择
+                q = 0.001 if encoding == IDENTITY else 0.0
+            if q > best_q:
+                best, best_q = self.variants[encoding], q
+        return best
+
+    @staticmethod
+    def _not_modified(if_none_match: str, etag: str) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match 使用弱比较，忽略 W/ 前缀
+        return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+    async def respond(self, request: Request) -> Response:
+        await self.refresh()
+        if not self.variants:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+
+        variant = self._select(request.headers.get("accept-encoding", ""))
+        if variant is None:
+            return Response("Not Acceptable", status_code=406, media_type="text/plain",
+                            headers={"Vary": "Accept-Encoding"})
+        headers = {
+            "ETag": variant.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if self._not_modified(request.headers.get("if-none-match", ""), variant.etag):
+            return Response(status_code=304, headers=headers)
+        if variant.encoding != IDENTITY:
+            headers["Content-Encoding"] = variant.encoding
+        body = b"" if request.method == "HEAD" else variant.body
+        response = Response(body, media_type=self.media_type, headers=headers)
+        if request.method == "HEAD":
+            response.headers["Content-Length"] = str(len(variant.body))
+        return response
+
+
+index_page = StaticAsset(
+    settings.STATIC_INDEX,
+    media_type="text/html; charset=utf-8",
+    cache_control=settings.STATIC_CACHE_CONTROL,
+    min_compress_bytes=settings.STATIC_MIN_COMPRESS_BYTES,
+    check_interval=settings.STATIC_CHECK_INTERVAL,
+)
+index_page.load()
+
+
+def _on_settings_change(new, old):
+    index_page.cache_control = new.STATIC_CACHE_CONTROL
+    index_page.min_compress_bytes = new.STATIC_MIN_COMPRESS_BYTES
+    index_page.check_interval = new.STATIC_CHECK_INTERVAL
+    if new.STATIC_INDEX != old.STATIC_INDEX or new.STATIC_MIN_COMPRESS_BYTES != old.STATIC_MIN_COMPRESS_BYTES:
+        # 回调在配置监听线程中执行，可以直接同步加载
+        index_page.path = new.STATIC_INDEX
+        index_page.load()
+
+
+settings.subscribe(_on_settings_change)
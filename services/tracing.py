@@ -0,0 +1,254 @@
+"""
+轻量级单轮对话追踪
+
+每个对话轮次是一条 trace，各阶段（接收、FFmpeg、ASR、LLM、TTS、发送）是其中的 span。
+结束的 span 写入内存环形缓冲区，可通过 /debug/traces 查看（需管理令牌）；配置了导出文件时，
+按 OTLP/JSON 格式逐行追加写入，便于离线分析 p99 异常轮次。
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("tiantian_current_span", default=None)
+
+
+class Span:
+    """追踪中的一个阶段"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 1 if self.status == "ok" else 2},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _OTLPFileExporter:
+    """
+    后台线程按 OTLP/JSON 行格式追加写入文件，不阻塞事件循环。
+    线程在首次导出时才启动，并记录所属进程：fork 出的子进程（--prefork）不会继承该线程，
+    首次导出时发现 pid 变化会重建队列和线程，不会把 span 写进无人消费的队列。
+    """
+
+    def __init__(self, path: str, service_name: str = "tiantian-server"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # 父进程队列中尚未写出的 span 由父进程负责，子进程使用新的队列
+            self._queue = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="trace-exporter", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def export(self, span: Span):
+        self._ensure_started()
+        self._queue.put(span)
+
+    def _run(self, spans: "queue.SimpleQueue[Optional[Span]]"):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = spans.get()
+                if span is None:
+                    break
+                record = {
+                    "resourceSpans": [{
+                        "resource": {"attributes": [
+                            {"key": "service.name", "value": {"stringValue": self.service_name}},
+                            {"key": "process.pid", "value": {"stringValue": str(os.getpid())}},
+                        ]},
+                        "scopeSpans": [{"scope": {"name": "tiantian.tracing"}, "spans": [span.to_otlp()]}],
+                    }]
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def close(self):
+        # 只停止本进程启动的线程
+        if self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._pid = None
+
+
+class _NullContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Tracer:
+    """追踪器：管理当前 span、环形缓冲区与导出"""
+
+    def __init__(self, enabled: bool, buffer_size: int = 2048, export_file: str = ""):
+        self.enabled = enabled
+        self._spans: deque = deque(maxlen=buffer_size)
+        self._exporter = _OTLPFileExporter(export_file) if enabled and export_file else None
+
+    def start_trace(self, name: str, **attributes) -> Optional[Span]:
+        """开始一条新的 trace，返回根 span（需调用 finish 结束）"""
+        if not self.enabled:
+            return None
+        return Span(name, os.urandom(16).hex(), None, attributes)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Optional[Span]:
+        """在 parent（默认当前 span）下开始子 span"""
+        parent = parent or _current_span.get()
+        if parent is None:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    def finish(self, span: Optional[Span], status: str = "ok"):
+        """结束 span 并写入缓冲区"""
+        if span is None or span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        if status != "ok":
+            span.status = status
+        self._spans.append(span)
+        if self._exporter:
+            self._exporter.export(span)
+
+    def activate(self, span: Optional[Span]) -> Optional[Token]:
+        """将 span 设为当前上下文的父 span"""
+        if span is None:
+            return None
+        return _current_span.set(span)
+
+    def deactivate(self, token: Optional[Token]):
+        if token is not None:
+            _current_span.reset(token)
+
+    def span(self, name: str, **attributes):
+        """子 span 上下文管理器；未启用或没有活动 trace 时为空操作"""
+        if not self.enabled or _current_span.get() is None:
+            return _NULL_CONTEXT
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name: str, attributes: Dict[str, Any]):
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute("error", str(e))
+            self.finish(span, status="error")
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def recent_traces(self, limit: int = 50, client_id: Optional[str] = None,
+                      min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        """按 trace 聚合最近的 span，最新的在前"""
+        traces: Dict[str, Dict[str, Any]] = {}
+        for span in list(self._spans):
+            trace = traces.setdefault(span.trace_id, {"trace_id": span.trace_id, "spans": []})
+            trace["spans"].append(span.to_dict())
+            if span.parent_id is None:
+                trace["root"] = span.name
+                trace["duration_ms"] = round(span.duration_ms, 3)
+                trace["start_ns"] = span.start_ns
+                trace.update({k: v for k, v in span.attributes.items() if k in ("client_id", "turn_id")})
+
+        result = []
+        for trace in traces.values():
+            if "root" not in trace:
+                continue  # 根 span 尚未结束或已被淘汰
+            if client_id and trace.get("client_id") != client_id:
+                continue
+            if trace["duration_ms"] < min_duration_ms:
+                continue
+            trace["spans"].sort(key=lambda s: s["start_ns"])
+            result.append(trace)
+        result.sort(key=lambda t: t["start_ns"], reverse=True)
+        return result[:limit]
+
+    def configure(self, enabled: bool, buffer_size: int):
+        """热更新开关与缓冲区大小（导出文件需重启生效）"""
+        self.enabled = enabled
+        if buffer_size != self._spans.maxlen:
+            self._spans = deque(self._spans, maxlen=buffer_size)
+
+    def close(self):
+        if self._exporter:
+            self._exporter.close()
+
+
+tracer = Tracer(
+    enabled=settings.TRACING_ENABLED,
+    buffer_size=settings.TRACING_BUFFER_SIZE,
+    export_file=settings.TRACING_EXPORT_FILE,
+)
+settings.subscribe(lambda new, old: tracer.configure(new.TRACING_ENABLED, new.TRACING_BUFFER_SIZE))
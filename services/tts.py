@@ -1,16 +1,13 @@
 import logging
-from edge_tts import Communicate
-import tempfile
-import os
 import asyncio
-from typing import Dict
+from typing import AsyncIterator, Dict
 from pathlib import Path
-from contextlib import asynccontextmanager
 from exceptions import TTSError
 from config.settings import settings
+from services import metrics
+from services.tracing import tracer
+from services.tts_pool import EdgeTTSPool
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -19,11 +16,12 @@ class TTSService:
         # 使用settings的TTS配置
         tts_config = settings.TTS
         
-        # 从配置获取语音设置
-        self.voices = tts_config['voices']
-        self.rate = tts_config['rate']
-        self.volume = tts_config['volume']
-        self.pitch = tts_config['pitch']
+        # 合成连接池：复用已握手的 WebSocket 连接，避免每次回复都建立新连接
+        self.pool = EdgeTTSPool()
+
+        # 从配置获取语音设置，配置热加载后自动更新
+        self._apply_settings(settings.snapshot)
+        settings.subscribe(self._on_settings_change)
         
         # 设置临时目录
         self._temp_dir = Path(tts_config['temp_dir'])
@@ -32,23 +30,41 @@ class TTSService:
         # 清理配置
         self._cleanup_max_age = tts_config['cleanup']['max_age_hours']
         self._cleanup_task = None
-        
+
         logger.info("TTS服务初始化完成")
         logger.info(f"使用语音配置: {self.voices}")
         logger.info(f"语速: {self.rate}, 音量: {self.volume}, 音调: {self.pitch}")
 
-    @asynccontextmanager
-    async def _get_temp_file(self, suffix: str = '.mp3'):
-        """创建临时文件的上下文管理器"""
-        temp_path = self._temp_dir / f"{os.urandom(8).hex()}{suffix}"
+    def _apply_settings(self, s):
+        tts_config = s.TTS
+        self.voices = dict(tts_config['voices'])
+        self.rate = tts_config['rate']
+        self.volume = tts_config['volume']
+        self.pitch = tts_config['pitch']
+
+        # 自定义合成服务地址（用于本地替身服务、压测等离线场景），为空时使用 Edge 官方地址
+        self.pool.configure(
+            url=s.TTS_ENDPOINT,
+            size=s.TTS_POOL_SIZE,
+            max_idle=s.TTS_POOL_MAX_IDLE,
+            max_requests=s.TTS_POOL_MAX_REQUESTS,
+            connect_timeout=s.TTS_CONNECT_TIMEOUT,
+            receive_timeout=s.TTS_RECEIVE_TIMEOUT,
+        )
+        if s.TTS_ENDPOINT:
+            logger.info(f"TTS合成服务地址: {s.TTS_ENDPOINT}")
+
+    def _on_settings_change(self, new, old):
+        self._apply_settings(new)
+        if new.TTS != old.TTS:
+            logger.info(f"TTS配置已更新: voices={self.voices}, rate={self.rate}, volume={self.volume}, pitch={self.pitch}")
+
+    async def start(self):
+        """预先建立合成连接（失败不影响服务，之后按需连接）"""
         try:
-            yield temp_path
-        finally:
-            try:
-                if temp_path.exists():
-                    temp_path.unlink()
-            except Exception as e:
-                logger.warning(f"清理临时文件失败 {temp_path}: {e}")
+            await self.pool.warm_up(settings.TTS_POOL_PREWARM)
+        except Exception as e:
+            logger.warning(f"TTS连接预热失败，将在首次合成时连接: {str(e)}")
 
     async def _cleanup_old_files(self):
         """清理旧的临时文件"""
@@ -79,36 +95,35 @@ class TTSService:
         
         try:
             logger.info(f"开始合成语音: {text[:50]}...")
-            logger.info(
+            logger.debug(
                 f"使用参数: voice={self.voices[lang]}, rate={self.rate}, volume={self.volume}, pitch={self.pitch}")
 
-            async with self._get_temp_file() as temp_path:
-                communicate = Communicate(
-                    text,
-                    voice=self.voices[lang],
-                    rate=self.rate,
-                    volume=self.volume,
-                    pitch=self.pitch,
-                )
-
-                try:
-                    await communicate.save(str(temp_path))
-                    return await self._read_audio_file(temp_path)
-                except Exception as e:
-                    raise TTSError(f"语音合成失败: {str(e)}")
+            with metrics.TTS_SECONDS.time(), \
+                    tracer.span("tts.synthesize", voice=self.voices[lang], chars=len(text)):
+                chunks = [
+                    chunk async for chunk in
+                    self.pool.stream(text, self.voices[lang], self.rate, self.volume, self.pitch)
+                ]
+            return b"".join(chunks)
 
         except Exception as e:
             logger.error(f"语音合成失败: {str(e)}")
             raise TTSError(f"语音合成失败: {str(e)}")
 
-    async def _read_audio_file(self, file_path: Path) -> bytes:
-        """异步读取音频文件"""
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """流式合成：不落盘，边合成边产出 MP3 数据块"""
+        if not text or not text.strip():
+            raise TTSError("输入文本不能为空")
+
+        text = self._clean_text(text)
+        lang = self._detect_language(text)
         try:
-            async with asyncio.Lock():
-                with open(file_path, 'rb') as f:
-                    return f.read()
+            with metrics.TTS_SECONDS.time():
+                async for chunk in self.pool.stream(text, self.voices[lang], self.rate, self.volume, self.pitch):
+                    yield chunk
         except Exception as e:
-            raise TTSError(f"读取音频文件失败: {str(e)}")
+            logger.error(f"流式语音合成失败: {str(e)}")
+            raise TTSError(f"语音合成失败: {str(e)}")
 
     def _detect_language(self, text: str) -> str:
         """基于启发式规则的语言检测"""
@@ -170,8 +185,15 @@ class TTSService:
         except Exception as e:
             logger.error(f"清理资源失败: {str(e)}")
 
+    async def close(self):
+        """关闭合成连接池"""
+        await self.pool.close()
+
 
 if __name__ == '__main__':
+    from config.logging_setup import setup_logging
+    setup_logging()
+
     async def test_tts():
         tts = TTSService()
         try:
@@ -181,6 +203,7 @@ if __name__ == '__main__':
             print(f"测试失败: {e}")
         finally:
             await tts.cleanup()
+            await tts.close()
 
 
     asyncio.run(test_tts())
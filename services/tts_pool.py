@@ -0,0 +1,235 @@
+"""
+Edge TTS 合成连接池
+
+edge_tts.Communicate 每次合成都新建 TLS WebSocket、握手并发送 speech.config。这里改为
+保持少量已完成握手和配置的连接，按请求复用（每次请求使用新的 X-RequestId）：
+- 取出连接前做健康检查：已关闭、空闲过久或已处理过多请求的连接直接丢弃
+- 复用的连接在收到任何音频前失败（通常是服务端已关闭空闲连接）时，换新连接重试一次
+- 并发超过池大小时临时新建连接，用完后关闭，不阻塞请求
+"""
+import ssl
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+from xml.sax.saxutils import escape
+
+import aiohttp
+import certifi
+from edge_tts.communicate import (
+    calc_max_mesg_size,
+    connect_id,
+    date_to_string,
+    get_headers_and_data,
+    mkssml,
+    remove_incompatible_characters,
+    split_text_by_byte_length,
+    ssml_headers_plus_data,
+)
+from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS, WSS_URL
+from edge_tts.data_classes import TTSConfig
+from edge_tts.drm import DRM
+from exceptions import TTSError
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# 只需要音频，关闭逐词边界元数据以减少下行消息
+SPEECH_CONFIG = (
+    '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+    '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+    '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"'
+    "}}}}\r\n"
+)
+
+TTS_CONNECTIONS = metrics.Counter("tiantian_tts_connections_total", "TTS 合成连接", ["event"])
+
+
+class _StaleConnection(Exception):
+    """复用的连接在收到音频前失效"""
+
+
+class _Connection:
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse, url: str):
+        self.ws = ws
+        self.url = url
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.requests = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.ws.closed
+
+    async def close(self):
+        if not self.ws.closed:
+            await self.ws.close()
+
+
+class EdgeTTSPool:
+    """Edge TTS 协议的持久连接池"""
+
+    def __init__(self, url: str = "", size: int = 4, max_idle: float = 30, max_requests: int = 100,
+                 connect_timeout: float = 10, receive_timeout: float = 60):
+        self.url = url or WSS_URL
+        self.size = size
+        self.max_idle = max_idle
+        self.max_requests = max_requests
+        self.connect_timeout = connect_timeout
+        self.receive_timeout = receive_timeout
+        self._idle: List[_Connection] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ssl = ssl.create_default_context(cafile=certifi.where())
+
+    def configure(self, url: str, size: int, max_idle: float, max_requests: int,
+                  connect_timeout: float, receive_timeout: float):
+        """
+        热加载：参数对之后取出的连接生效，按旧地址建立的连接在下次取出时丢弃
+        （回调在配置监听线程中执行，这里不能直接操作事件循环中的连接）
+        """
+        self.url = url or WSS_URL
+        self.size = size
+        self.max_idle = max_idle
+        self.max_requests = max_requests
+        self.connect_timeout = connect_timeout
+        self.receive_timeout = receive_timeout
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(trust_env=True)
+        return self._session
+
+    @staticmethod
+    def _connect_url(url: str) -> str:
+        return (f"{url}&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+                f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}&ConnectionId={connect_id()}")
+
+    async def _open(self) -> _Connection:
+        """建立连接并发送一次 speech.config；403 时按服务端时间校正 DRM 时钟后重试一次"""
+        url = self.url
+        for attempt in range(2):
+            try:
+                ws = await self._get_session().ws_connect(
+                    self._connect_url(url),
+                    compress=15,
+                    headers=WSS_HEADERS,
+                    ssl=self._ssl if url.startswith("wss://") else True,
+                )
+                break
+            except aiohttp.ClientResponseError as e:
+                if e.status != 403 or attempt:
+                    raise
+                DRM.handle_client_response_error(e)
+        await ws.send_str(
+            f"X-Timestamp:{date_to_string()}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            f"Path:speech.config\r\n\r\n{SPEECH_CONFIG}"
+        )
+        TTS_CONNECTIONS.labels("opened").inc()
+        return _Connection(ws, url)
+
+    def _healthy(self, conn: _Connection) -> bool:
+        if conn.closed or conn.url != self.url:
+            return False
+        if time.monotonic() - conn.last_used > self.max_idle:
+            return False
+        return conn.requests < self.max_requests
+
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            conn = self._idle.pop()
+            if self._healthy(conn):
+                TTS_CONNECTIONS.labels("reused").inc()
+                return conn
+            TTS_CONNECTIONS.labels("expired").inc()
+            await conn.close()
+        return await asyncio.wait_for(self._open(), self.connect_timeout)
+
+    async def _release(self, conn: _Connection, reusable: bool):
+        conn.last_used = time.monotonic()
+        if reusable and len(self._idle) < self.size and self._healthy(conn):
+            self._idle.append(conn)
+        else:
+            await conn.close()
+
+    async def warm_up(self, connections: int = 1):
+        """预先建立连接，首个请求不再承担握手延迟"""
+        opened = await asyncio.gather(
+            *(asyncio.wait_for(self._open(), self.connect_timeout)
+              for _ in range(max(0, min(connections, self.size) - len(self._idle)))),
+        )
+        self._idle.extend(opened)
+        logger.info(f"TTS connection pool warmed up: {len(self._idle)} idle connections")
+
+    async def _request(self, conn: _Connection, ssml: str) -> AsyncIterator[bytes]:
+        """在一个连接上完成一次 ssml 请求，直到 turn.end"""
+        request_id = connect_id()
+        conn.requests += 1
+        try:
+            await conn.ws.send_str(ssml_headers_plus_data(request_id, date_to_string(), ssml))
+        except (aiohttp.ClientError, ConnectionError) as e:
+            # 对端已关闭但本地尚未处理关闭帧时，发送就会失败
+            raise _StaleConnection(f"发送请求失败: {str(e)}")
+        received_audio = False
+        while True:
+            msg = await conn.ws.receive(timeout=self.receive_timeout)
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                encoded = msg.data.encode("utf-8")
+                headers, _ = get_headers_and_data(encoded, encoded.find(b"\r\n\r\n"))
+                if headers.get(b"X-RequestId", request_id.encode()) != request_id.encode():
+                    continue  # 上一次被中断的请求残留的消息
+                if headers.get(b"Path") == b"turn.end":
+                    break
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                if len(msg.data) < 2:
+                    raise TTSError("音频消息缺少头部长度")
+                header_length = int.from_bytes(msg.data[:2], "big")
+                headers, data = get_headers_and_data(msg.data, header_length)
+                if headers.get(b"X-RequestId", request_id.encode()) != request_id.encode():
+                    continue
+                if headers.get(b"Path") == b"audio" and data:
+                    received_audio = True
+                    yield data
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                if not received_audio:
+                    raise _StaleConnection(f"连接已关闭: {msg.type.name}")
+                raise TTSError("合成连接在音频传输中断开")
+        if not received_audio:
+            raise TTSError("未收到音频数据，请检查语音参数")
+
+    async def stream(self, text: str, voice: str, rate: str, volume: str, pitch: str) -> AsyncIterator[bytes]:
+        """合成文本并逐块产出 MP3 数据；长文本按服务端消息大小限制分段"""
+        config = TTSConfig(voice, rate, volume, pitch)
+        segments = split_text_by_byte_length(
+            escape(remove_incompatible_characters(text)), calc_max_mesg_size(config)
+        )
+        for segment in segments:
+            ssml = mkssml(config, segment)
+            for attempt in range(2):
+                conn = await self._acquire()
+                reused = conn.requests > 0
+                completed = False
+                try:
+                    async for chunk in self._request(conn, ssml):
+                        yield chunk
+                    completed = True
+                    break
+                except (_StaleConnection, aiohttp.ClientError, ConnectionError) as e:
+                    if reused and attempt == 0 and isinstance(e, _StaleConnection):
+                        TTS_CONNECTIONS.labels("stale").inc()
+                        logger.debug(f"Reused TTS connection was stale, reconnecting: {e}")
+                        continue
+                    raise TTSError(f"合成连接失败: {str(e)}")
+                except asyncio.TimeoutError:
+                    raise TTSError("等待合成结果超时")
+                finally:
+                    # 未完整读到 turn.end 的连接（包括调用方提前停止迭代）不再复用
+                    await self._release(conn, completed)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(conn.close() for conn in idle), return_exceptions=True)
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,74 @@
+"""
+测试公共夹具
+
+配置文件按工作目录的相对路径读取，测试统一在仓库根目录下运行。
+LLM / Edge TTS / Redis 使用 tools 中的本地替身服务，运行在独立线程的事件循环中，
+与 TestClient 自己的事件循环互不干扰。
+"""
+import os
+import sys
+import asyncio
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class BackgroundLoop:
+    """在后台线程中运行的事件循环"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="standins", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: float = 30):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+
+
+class StandIns:
+    def __init__(self, llm, tts, redis):
+        self.llm = llm
+        self.tts = tts
+        self.redis = redis
+
+    @property
+    def redis_url(self) -> str:
+        return f"redis://{self.redis.host}:{self.redis.port}/0"
+
+
+@pytest.fixture
+def run():
+    """在新的事件循环中运行协程并返回结果"""
+    return asyncio.run
+
+
+@pytest.fixture(scope="session")
+def standins():
+    """本地 LLM、Edge TTS 与 Redis 替身服务（整个测试会话共用）"""
+    from tools.standins import MockLLMServer, MockEdgeTTSServer
+    from tools.redis_standin import RedisStandIn
+
+    background = BackgroundLoop()
+    services = StandIns(
+        MockLLMServer(latency=0.01, reply_chars=40),
+        MockEdgeTTSServer(latency=0.01, bytes_per_char=200),
+        RedisStandIn(port=0),
+    )
+    for service in (services.llm, services.tts, services.redis):
+        background.run(service.start())
+    try:
+        yield services
+    finally:
+        for service in (services.llm, services.tts, services.redis):
+            background.run(service.stop())
+        background.close()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from exceptions import ASRError
+from services.asr import RecognitionBatcher
+
+
+class FakeRecognizer:
+    """代替 ASRService：批量识别在线程池中阻塞 delay 秒，并记录每批的大小"""
+
+    def __init__(self, delay: float, workers: int = 1):
+        self.delay = delay
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self.max_running = 0
+
+    def recognize(self, samples: np.ndarray) -> str:
+        return self.recognize_batch([samples])[0]
+
+    def recognize_batch(self, batch):
+        with self._lock:
+            self.batch_sizes.append(len(batch))
+            self._running += 1
+            self.max_running = max(self.max_running, self._running)
+        time.sleep(self.delay)
+        with self._lock:
+            self._running -= 1
+        return [f"text-{int(samples[0])}" for samples in batch]
+
+
+def _samples(value: int) -> np.ndarray:
+    return np.full(160, value, dtype=np.float32)
+
+
+def test_single_request_is_not_delayed(run):
+    service = FakeRecognizer(delay=0)
+    batcher = RecognitionBatcher(service, max_size=8, window_ms=500)
+
+    async def scenario():
+        start = time.perf_counter()
+        text = await batcher.submit(_samples(1))
+        return text, time.perf_counter() - start
+
+    text, elapsed = run(scenario())
+    assert text == "text-1"
+    assert elapsed < 0.4
+    assert service.batch_sizes == [1]
+
+
+def test_requests_arriving_during_a_batch_are_merged(run):
+    """线程池只有一个线程：前一批推理期间陆续到达的请求合并为下一批，而不是逐个排队"""
+    service = FakeRecognizer(delay=0.3)
+    batcher = RecognitionBatcher(service, max_size=8, window_ms=10, concurrency=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(batcher.submit(_samples(0)))
+        later = []
+        for i in range(1, 6):
+            await asyncio.sleep(0.03)
+            later.append(asyncio.ensure_future(batcher.submit(_samples(i))))
+        return await asyncio.gather(first, *later)
+
+    texts = run(scenario())
+    assert texts == [f"text-{i}" for i in range(6)]
+    assert service.batch_sizes == [1, 5]
+
+
+def test_concurrent_batches_limited_to_executor_size(run):
+    service = FakeRecognizer(delay=0.1, workers=2)
+    batcher = RecognitionBatcher(service, max_size=2, window_ms=10, concurrency=2)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(_samples(i)) for i in range(8)))
+
+    assert run(scenario()) == [f"text-{i}" for i in range(8)]
+    assert sum(service.batch_sizes) == 8
+    assert service.max_running == 2
+
+
+def test_close_with_cancel_fails_queued_requests(run):
+    service = FakeRecognizer(delay=0.2)
+    batcher = RecognitionBatcher(service, max_size=1, window_ms=10, concurrency=1)
+
+    async def scenario():
+        futures = [asyncio.ensure_future(batcher.submit(_samples(i))) for i in range(3)]
+        await asyncio.sleep(0.05)
+        batcher.close(cancel_running=True)
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, ASRError) for result in results)
+    # 关闭后的请求直接在线程池中识别
+    assert run(batcher.submit(_samples(7))) == "text-7"
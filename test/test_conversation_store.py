@@ -0,0 +1,110 @@
+import asyncio
+
+from services.conversation_store import InMemoryConversationStore, RedisConversationStore
+
+HISTORY = [
+    {"role": "user", "content": "你好，甜甜"},
+    {"role": "assistant", "content": "你好！有什么可以帮你？"},
+]
+
+
+def test_redis_store_round_trip(standins, run):
+    async def scenario():
+        store = RedisConversationStore(standins.redis_url, key_prefix="test:roundtrip:")
+        try:
+            await store.ping()
+            assert await store.load("s1") == []
+            await store.save("s1", HISTORY)
+            assert await store.load("s1") == HISTORY
+            # 会话之间互相隔离
+            assert await store.load("s2") == []
+            await store.clear("s1")
+            assert await store.load("s1") == []
+        finally:
+            await store.close()
+
+    run(scenario())
+
+
+def test_redis_store_shared_between_workers(standins, run):
+    """两个独立的客户端（相当于两个工作进程）看到同一份对话历史"""
+    async def scenario():
+        first = RedisConversationStore(standins.redis_url, key_prefix="test:shared:")
+        second = RedisConversationStore(standins.redis_url, key_prefix="test:shared:")
+        try:
+            await first.save("session", HISTORY[:1])
+            history = await second.load("session")
+            assert history == HISTORY[:1]
+            await second.save("session", history + HISTORY[1:])
+            assert await first.load("session") == HISTORY
+        finally:
+            await first.close()
+            await second.close()
+
+    run(scenario())
+
+
+def test_redis_store_expires_sessions(standins, run):
+    async def scenario():
+        store = RedisConversationStore(standins.redis_url, key_prefix="test:ttl:", ttl=1)
+        try:
+            await store.save("s1", HISTORY)
+            assert await store._client.ttl(store._key("s1")) in (0, 1)
+            await asyncio.sleep(1.1)
+            assert await store.load("s1") == []
+        finally:
+            await store.close()
+
+    run(scenario())
+
+
+def test_redis_store_ignores_corrupted_history(standins, run):
+    async def scenario():
+        store = RedisConversationStore(standins.redis_url, key_prefix="test:corrupt:")
+        try:
+            await store._client.set(store._key("s1"), "{not json")
+            assert await store.load("s1") == []
+        finally:
+            await store.close()
+
+    run(scenario())
+
+
+def test_memory_store_returns_copies(run):
+    async def scenario():
+        store = InMemoryConversationStore()
+        await store.save("s1", HISTORY)
+        history = await store.load("s1")
+        history.append({"role": "user", "content": "再见"})
+        assert await store.load("s1") == HISTORY
+
+    run(scenario())
+
+
+def test_memory_store_expires_idle_sessions(run):
+    async def scenario():
+        store = InMemoryConversationStore(ttl=60)
+        await store.save("old", HISTORY)
+        await store.save("recent", HISTORY)
+        # 把 old 的最后访问时间拨回 70 秒前
+        touched, history = store._histories["old"]
+        store._histories["old"] = (touched - 70, history)
+        assert await store.load("old") == []
+        assert await store.load("recent") == HISTORY
+        assert list(store._histories) == ["recent"]
+
+    run(scenario())
+
+
+def test_memory_store_evicts_least_recently_used(run):
+    async def scenario():
+        store = InMemoryConversationStore(max_sessions=2)
+        await store.save("a", HISTORY)
+        await store.save("b", HISTORY)
+        await store.load("a")
+        await store.save("c", HISTORY)
+        assert await store.load("b") == []
+        assert await store.load("a") == HISTORY
+        assert await store.load("c") == HISTORY
+
+    run(scenario())
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from routers.ws import DialogueState
+from services.governor import ConnectionGovernor
+
+
+@pytest.fixture
+def governor():
+    governor = ConnectionGovernor()
+    governor.max_sessions = 2
+    governor.max_pending_turns = 2
+    governor.idle_timeout = 60
+    governor.ping_interval = 20
+    governor.pong_timeout = 20
+    return governor
+
+
+def test_admit_session_enforces_limit(governor):
+    assert governor.admit_session(0)
+    assert governor.admit_session(1)
+    assert not governor.admit_session(2)
+    assert governor.rejected_sessions == 1
+
+
+def test_pending_turns_are_limited_and_released(governor):
+    assert governor.acquire_turn()
+    assert governor.acquire_turn()
+    assert not governor.acquire_turn()
+    governor.release_turn()
+    assert governor.acquire_turn()
+    assert governor.rejected_turns == 1
+
+
+def test_find_expired_reports_idle_and_unresponsive_sessions(governor):
+    now = time.time()
+    idle, silent, active = DialogueState("idle"), DialogueState("silent"), DialogueState("active")
+    idle.last_interaction_time = now - 120
+    silent.last_pong_time = now - 60
+    expired = governor.find_expired({"idle": idle, "silent": silent, "active": active}, now=now)
+    assert sorted(expired) == [("idle", "idle"), ("silent", "unresponsive")]
+
+
+@pytest.mark.parametrize("mark_busy", [
+    lambda state: setattr(state, "processing", True),
+    lambda state: setattr(state, "pending_turns", 1),
+    lambda state: setattr(state, "audio_stream", object()),
+])
+def test_find_expired_skips_busy_sessions(governor, mark_busy):
+    now = time.time()
+    state = DialogueState("queued")
+    state.last_interaction_time = now - 120
+    state.last_pong_time = now - 120
+    mark_busy(state)
+    assert governor.find_expired({"queued": state}, now=now) == []
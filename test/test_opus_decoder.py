@@ -0,0 +1,84 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from exceptions import FFmpegError
+from services.asr import OpusPacketDecoder
+
+SAMPLE_RATE = 16000
+FRAME = SAMPLE_RATE * 20 // 1000  # 20ms
+
+
+def _frame(packet: bytes) -> bytes:
+    return len(packet).to_bytes(2, "big") + packet
+
+
+@pytest.fixture
+def fake_opuslib(monkeypatch):
+    """以包内容的首字节作为样本值、每包解码为 20ms 的替身解码器，用于检查分包逻辑"""
+    decoded = []
+
+    class Decoder:
+        def __init__(self, sample_rate, channels):
+            assert (sample_rate, channels) == (SAMPLE_RATE, 1)
+
+        def decode(self, packet, frame_size):
+            if packet == b"bad":
+                raise ValueError("corrupted stream")
+            decoded.append(packet)
+            return np.full(FRAME, packet[0], dtype=np.int16).tobytes()
+
+    monkeypatch.setitem(sys.modules, "opuslib", types.SimpleNamespace(Decoder=Decoder))
+    return decoded
+
+
+def test_packets_split_across_chunks(fake_opuslib, run):
+    decoder = OpusPacketDecoder(SAMPLE_RATE)
+    stream = b"".join(_frame(bytes([value]) * 40) for value in (1, 2, 3))
+
+    async def feed():
+        # 长度前缀和包体都可能被拆到不同的数据块中
+        for i in range(0, len(stream), 7):
+            await decoder.feed(stream[i:i + 7])
+        return await decoder.finish()
+
+    pcm = run(feed())
+    assert [packet[0] for packet in fake_opuslib] == [1, 2, 3]
+    assert decoder.bytes_received == len(stream)
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    assert len(samples) == 3 * FRAME
+    assert list(samples[::FRAME]) == [1, 2, 3]
+
+
+def test_incomplete_trailing_packet_is_dropped(fake_opuslib):
+    decoder = OpusPacketDecoder(SAMPLE_RATE)
+    decoder.decode(_frame(b"\x05" * 10) + _frame(b"\x06" * 10)[:6])
+    assert len(decoder.pcm) == FRAME * 2
+    assert len(fake_opuslib) == 1
+
+
+def test_corrupted_packet_raises(fake_opuslib):
+    decoder = OpusPacketDecoder(SAMPLE_RATE)
+    with pytest.raises(FFmpegError):
+        decoder.decode(_frame(b"bad"))
+
+
+def test_missing_opuslib_is_reported(monkeypatch):
+    monkeypatch.setitem(sys.modules, "opuslib", None)
+    with pytest.raises(FFmpegError):
+        OpusPacketDecoder(SAMPLE_RATE)
+
+
+def test_decodes_real_opus_packets():
+    opuslib = pytest.importorskip("opuslib")
+    encoder = opuslib.Encoder(SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
+    tone = (np.sin(np.arange(FRAME * 5) * 2 * np.pi * 440 / SAMPLE_RATE) * 8000).astype(np.int16)
+    packets = [encoder.encode(tone[i:i + FRAME].tobytes(), FRAME) for i in range(0, len(tone), FRAME)]
+
+    decoder = OpusPacketDecoder(SAMPLE_RATE)
+    decoder.decode(b"".join(_frame(packet) for packet in packets))
+    samples = np.frombuffer(decoder.pcm, dtype=np.int16)
+    assert len(samples) == len(tone)
+    assert np.abs(samples).max() > 1000
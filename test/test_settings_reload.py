@@ -0,0 +1,115 @@
+import copy
+
+import pytest
+
+from config.settings import SettingsProvider, config_manager, settings
+from services.governor import ConnectionGovernor
+
+
+@pytest.fixture
+def provider():
+    """独立的 SettingsProvider：订阅者只有测试注册的回调"""
+    instance = SettingsProvider()
+    yield instance
+    config_manager._listeners.remove(instance._on_reload)
+
+
+def _config(**websocket) -> dict:
+    config = copy.deepcopy(config_manager.get_all())
+    config.setdefault("websocket", {}).update(websocket)
+    return config
+
+
+def test_reload_publishes_new_snapshot_to_subscribers(provider):
+    calls = []
+    provider.subscribe(lambda new, old: calls.append((new, old)))
+    before = provider.snapshot
+
+    provider._on_reload(_config(idle_timeout=1234))
+
+    assert len(calls) == 1
+    new, old = calls[0]
+    assert old is before
+    assert new is provider.snapshot
+    assert new.VERSION == old.VERSION + 1
+    assert new.WS_IDLE_TIMEOUT == 1234
+    assert provider.WS_IDLE_TIMEOUT == 1234
+    # 旧快照保持不变，持有它的调用方看到的是一致的旧配置
+    assert old.WS_IDLE_TIMEOUT != 1234
+
+
+def test_unchanged_config_does_not_notify(provider):
+    calls = []
+    provider.subscribe(lambda new, old: calls.append(new))
+    provider._on_reload(copy.deepcopy(config_manager.get_all()))
+    assert calls == []
+    assert provider.VERSION == 1
+
+
+def test_restart_only_keys_are_ignored(provider):
+    calls = []
+    provider.subscribe(lambda new, old: calls.append(new))
+    config = copy.deepcopy(config_manager.get_all())
+    config["session_store"]["backend"] = "something-else"
+
+    provider._on_reload(config)
+    assert calls == []
+    assert provider.SESSION_STORE_BACKEND == settings.SESSION_STORE_BACKEND
+
+    config["websocket"]["idle_timeout"] = 4321
+    provider._on_reload(config)
+    assert len(calls) == 1
+    assert provider.WS_IDLE_TIMEOUT == 4321
+    assert provider.SESSION_STORE_BACKEND == settings.SESSION_STORE_BACKEND
+
+
+def test_invalid_config_keeps_current_snapshot(provider):
+    calls = []
+    provider.subscribe(lambda new, old: calls.append(new))
+    before = provider.snapshot
+    config = copy.deepcopy(config_manager.get_all())
+    del config["tts"]
+
+    provider._on_reload(config)
+    assert calls == []
+    assert provider.snapshot is before
+
+
+def test_failing_subscriber_does_not_block_others(provider):
+    calls = []
+
+    def broken(new, old):
+        raise RuntimeError("boom")
+
+    provider.subscribe(broken)
+    provider.subscribe(lambda new, old: calls.append(new.VERSION))
+    provider._on_reload(_config(idle_timeout=99))
+    assert calls == [2]
+
+    provider.unsubscribe(broken)
+    provider._on_reload(_config(idle_timeout=100))
+    assert calls == [2, 3]
+
+
+def test_snapshots_are_read_only(provider):
+    snapshot = provider.snapshot
+    with pytest.raises(AttributeError):
+        snapshot.WS_IDLE_TIMEOUT = 1
+    with pytest.raises(TypeError):
+        snapshot.TTS_VOICES["zh"] = "other"
+
+
+def test_governor_applies_reloaded_limits():
+    governor = ConnectionGovernor()
+    original = copy.deepcopy(settings._raw)
+    try:
+        settings._on_reload(_config(max_sessions=3, max_pending_turns=1))
+        assert governor.max_sessions == 3
+        assert governor.admit_session(2)
+        assert not governor.admit_session(3)
+        assert governor.acquire_turn()
+        assert not governor.acquire_turn()
+    finally:
+        settings._on_reload(original)
+        settings.unsubscribe(governor._on_settings_change)
+    assert governor.max_sessions == settings.WS_MAX_SESSIONS
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services import static_assets
+from services.static_assets import StaticAsset
+
+PAGE = ("<!DOCTYPE html><html><body>" + "甜甜语音助手 " * 200 + "</body></html>").encode("utf-8")
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    """只生成 gzip 变体，选择结果与是否安装 brotli 无关"""
+    monkeypatch.setattr(static_assets, "brotli", None)
+    path = tmp_path / "index.html"
+    path.write_bytes(PAGE)
+    asset = StaticAsset(str(path), media_type="text/html; charset=utf-8", check_interval=0)
+    asset.load()
+    return asset
+
+
+@pytest.fixture
+def client(page):
+    app = FastAPI()
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def index(request: Request):
+        return await page.respond(request)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _get(client, accept_encoding: str, **headers):
+    return client.get("/", headers={"Accept-Encoding": accept_encoding, **headers})
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.2, identity;q=0.8", None),
+    ("deflate", None),
+    ("", None),
+    ("*;q=0.5", "gzip"),
+    ("GZIP; Q=1.0", "gzip"),
+    ("gzip;q=abc", None),
+])
+def test_selects_encoding_by_q_value(client, accept_encoding, expected):
+    response = _get(client, accept_encoding)
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == PAGE
+
+
+def test_prefers_brotli_at_equal_q(tmp_path):
+    pytest.importorskip("brotli")
+    path = tmp_path / "index.html"
+    path.write_bytes(PAGE)
+    asset = StaticAsset(str(path), media_type="text/html")
+    asset.load()
+    assert asset._select("gzip, br").encoding == "br"
+    assert asset._select("gzip, br;q=0.5").encoding == "gzip"
+
+
+def test_rejects_when_no_encoding_is_acceptable(client):
+    response = _get(client, "identity;q=0, *;q=0")
+    assert response.status_code == 406
+
+
+def test_each_encoding_has_its_own_etag(client):
+    identity = _get(client, "identity").headers["etag"]
+    gzipped = _get(client, "gzip").headers["etag"]
+    assert identity != gzipped
+    assert identity.startswith('"') and gzipped.startswith('"')
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_revalidation_returns_304(client, if_none_match):
+    etag = _get(client, "gzip").headers["etag"]
+    response = _get(client, "gzip", **{"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_etag_of_other_encoding_does_not_match(client):
+    etag = _get(client, "identity").headers["etag"]
+    response = _get(client, "gzip", **{"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_head_reports_length_without_body(client, page):
+    response = client.head("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert int(response.headers["content-length"]) == len(page.variants["gzip"].body)
+
+
+def test_reloads_changed_file(client, page):
+    before = _get(client, "identity").headers["etag"]
+    changed = PAGE.replace(b"</body>", b"<p>v2</p></body>")
+    with open(page.path, "wb") as f:
+        f.write(changed)
+    # 保证 mtime 变化（部分文件系统的时间精度较低）
+    future = time.time() + 5
+    os.utime(page.path, (future, future))
+
+    response = _get(client, "identity")
+    assert response.content == changed
+    assert response.headers["etag"] != before
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from exceptions import TTSError
+from services.tts import TTSService
+from services.tts_pool import EdgeTTSPool
+from tools.standins import MockEdgeTTSServer
+
+VOICE = "zh-CN-XiaoxiaoNeural"
+MP3_FRAME_SYNC = b"\xff\xfb"
+
+
+async def _synthesize(pool: EdgeTTSPool, text: str) -> bytes:
+    return b"".join([chunk async for chunk in pool.stream(text, VOICE, "+0%", "+0%", "+0Hz")])
+
+
+async def _serve_tts(**kwargs) -> MockEdgeTTSServer:
+    server = MockEdgeTTSServer(latency=0.01, bytes_per_char=200, **kwargs)
+    await server.start()
+    return server
+
+
+def test_pool_reuses_connection(run):
+    async def scenario():
+        server = await _serve_tts()
+        pool = EdgeTTSPool(server.url, size=2)
+        try:
+            for text in ("你好", "今天天气不错", "Hello there"):
+                audio = await _synthesize(pool, text)
+                assert audio.startswith(MP3_FRAME_SYNC)
+            assert server.requests == 3
+            assert server.connections == 1
+        finally:
+            await pool.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_pool_warm_up_opens_connections_ahead_of_time(run):
+    async def scenario():
+        server = await _serve_tts()
+        pool = EdgeTTSPool(server.url, size=2)
+        try:
+            await pool.warm_up(2)
+            assert server.connections == 2
+            await _synthesize(pool, "你好")
+            assert server.connections == 2
+        finally:
+            await pool.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_pool_overflow_uses_temporary_connections(run):
+    """并发超过池大小时临时新建连接，结束后池中最多保留 size 个空闲连接"""
+    async def scenario():
+        server = await _serve_tts()
+        pool = EdgeTTSPool(server.url, size=1)
+        try:
+            results = await asyncio.gather(*(_synthesize(pool, f"第{i}句话") for i in range(3)))
+            assert all(audio.startswith(MP3_FRAME_SYNC) for audio in results)
+            assert server.connections == 3
+            assert len(pool._idle) == 1
+        finally:
+            await pool.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_pool_retries_stale_connection_after_server_restart(run):
+    async def scenario():
+        server = await _serve_tts()
+        port = server.port
+        pool = EdgeTTSPool(server.url, size=1)
+        try:
+            await _synthesize(pool, "你好")
+            # 服务端重启：池中的空闲连接已被对端关闭
+            await server.stop()
+            server = await _serve_tts(port=port)
+            audio = await _synthesize(pool, "再来一次")
+            assert audio.startswith(MP3_FRAME_SYNC)
+            assert server.requests == 1
+        finally:
+            await pool.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_pool_reports_connection_failure(run):
+    async def scenario():
+        server = await _serve_tts()
+        url = server.url
+        await server.stop()
+        pool = EdgeTTSPool(url, size=1, connect_timeout=2)
+        try:
+            with pytest.raises((TTSError, OSError)):
+                await _synthesize(pool, "你好")
+        finally:
+            await pool.close()
+
+    run(scenario())
+
+
+def test_tts_service_synthesizes_through_pool(run):
+    async def scenario():
+        server = await _serve_tts()
+        tts = TTSService()
+        tts.pool.url = server.url
+        try:
+            first = await tts.synthesize("你好，我是甜甜。")
+            second = await tts.synthesize("Nice to meet you.")
+            assert first.startswith(MP3_FRAME_SYNC)
+            assert second.startswith(MP3_FRAME_SYNC)
+            assert server.connections == 1
+        finally:
+            await tts.close()
+            await server.stop()
+
+    run(scenario())
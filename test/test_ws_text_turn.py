@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import ws
+from services.conversation_store import RedisConversationStore
+from services.health import health
+
+
+@pytest.fixture(scope="module")
+def client(standins):
+    """只挂载 WebSocket 路由的应用：LLM / TTS / 会话存储指向本地替身，跳过 ASR 模型加载"""
+    manager = ws.manager
+    original = (manager.llm.api_url, manager.tts.pool.url, manager.session_store, manager.llm.store.backend)
+    store = RedisConversationStore(standins.redis_url, key_prefix="test:ws:")
+    manager.llm.api_url = standins.llm.url
+    manager.tts.pool.url = standins.tts.url
+    manager.session_store = manager.llm.store.backend = store
+    for name in ("asr", "tts", "llm", "session_store"):
+        health.mark_ready(name)
+
+    app = FastAPI()
+    app.include_router(ws.router)
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(manager.tts.close)
+        test_client.portal.call(store.close)
+
+    manager.llm.api_url, manager.tts.pool.url, manager.session_store, manager.llm.store.backend = original
+
+
+def _receive_turn(connection):
+    """收集一个文本轮次的回复：response 文本、音频数据，直到 audio_end"""
+    reply, audio = None, bytearray()
+    while True:
+        message = connection.receive()
+        if message.get("bytes") is not None:
+            audio += message["bytes"]
+            continue
+        data = json.loads(message["text"])
+        if data["type"] == "ping":
+            continue
+        assert data["type"] != "error", data
+        if data["type"] == "response":
+            reply = data["text"]
+        elif data["type"] == "audio_end":
+            return reply, bytes(audio)
+
+
+def test_text_turn_returns_reply_and_audio(client, standins):
+    with client.websocket_connect("/ws/chat") as connection:
+        session = json.loads(connection.receive_text())
+        assert session["type"] == "session"
+
+        connection.send_text(json.dumps({"type": "text", "text": "你好"}))
+        reply, audio = _receive_turn(connection)
+
+    assert reply.startswith("收到：你好")
+    assert audio.startswith(b"\xff\xfb")
+
+
+def test_session_history_survives_reconnect(client, standins):
+    """断线后携带 session_id 重连，对话历史从共享存储恢复"""
+    with client.websocket_connect("/ws/chat") as connection:
+        session_id = json.loads(connection.receive_text())["session_id"]
+        connection.send_text(json.dumps({"type": "text", "text": "第一句"}))
+        _receive_turn(connection)
+
+    with client.websocket_connect(f"/ws/chat?session_id={session_id}") as connection:
+        assert json.loads(connection.receive_text())["session_id"] == session_id
+        connection.send_text(json.dumps({"type": "text", "text": "第二句"}))
+        _receive_turn(connection)
+
+    history = client.portal.call(ws.manager.session_store.load, session_id)
+    assert [m["content"] for m in history if m["role"] == "user"] == ["第一句", "第二句"]
+    assert [m["role"] for m in history].count("assistant") == 2
+
+
+def test_rejects_connections_while_not_ready(client):
+    health.mark_loading("tts")
+    try:
+        with client.websocket_connect("/ws/chat") as connection:
+            assert json.loads(connection.receive_text())["type"] == "busy"
+    finally:
+        health.mark_ready("tts")
+
+
+def test_text_turns_do_not_wait_for_asr(client):
+    """ASR 模型加载期间可以建立会话并进行文本对话，语音轮次返回错误"""
+    health.mark_loading("asr")
+    try:
+        with client.websocket_connect("/ws/chat") as connection:
+            assert json.loads(connection.receive_text())["type"] == "session"
+            connection.send_text(json.dumps({"type": "audio_start", "codec": "wav"}))
+            error = json.loads(connection.receive_text())
+            assert error["type"] == "error"
+            connection.send_bytes(b"RIFF")
+            connection.send_text(json.dumps({"type": "audio_end"}))
+
+            connection.send_text(json.dumps({"type": "text", "text": "你好"}))
+            reply, _ = _receive_turn(connection)
+        assert reply.startswith("收到：你好")
+        assert health.snapshot()["capabilities"] == {"text": True, "audio": False}
+    finally:
+        health.mark_ready("asr")
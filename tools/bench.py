@@ -0,0 +1,273 @@
+"""
+热点组件微基准测试与回归对比
+
+覆盖 FFmpeg 预处理、ASR 识别、文本后处理、TTS 语言检测/文本清洗、DialogueState 缓冲区
+操作与消息序列化。结果可保存为 JSON 基线，之后与基线比较，超出容忍度即视为回归
+（退出码为 1），便于在 CI 或部署前拦截性能退化。
+
+用法:
+    python -m tools.bench --save                 # 生成/覆盖基线
+    python -m tools.bench --tolerance 0.15       # 与基线比较
+    python -m tools.bench --filter tts           # 只运行名称包含 tts 的基准
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+from typing import Callable, Dict, List, Optional
+
+SAMPLE_AUDIO = os.path.join("test", "sample", "sample-3s.wav")
+DEFAULT_BASELINE = os.path.join("tools", "bench_baseline.json")
+
+ASR_RAW_TEXT = "<|zh|><|NEUTRAL|><|Speech|><|withitn|>你好，甜甜！今天天气怎么样？Let's go to the park, OK?"
+TTS_TEXTS = [
+    "你好，我是甜甜，很高兴为你服务。",
+    "**Hello**, how can I help you today?",
+    "今天的会议安排在下午三点，请提前10分钟到达 meeting room B。",
+]
+
+
+class Benchmark:
+    """单个基准：setup 返回被测的零参数可调用对象（可返回协程）"""
+
+    def __init__(self, name: str, setup: Callable[[], Callable], requires: str = ""):
+        self.name = name
+        self.setup = setup
+        self.requires = requires
+
+
+def _bench_ffmpeg_process_audio():
+    from services.asr import FFmpegProcessor
+    processor = FFmpegProcessor()
+    with open(SAMPLE_AUDIO, "rb") as f:
+        audio = f.read()
+    return lambda: processor.process_audio(audio, "wav")
+
+
+def _bench_ffmpeg_process_pcm():
+    from services.asr import FFmpegProcessor
+    processor = FFmpegProcessor()
+    with open(SAMPLE_AUDIO, "rb") as f:
+        audio = f.read()
+    return lambda: processor.process_pcm(audio)
+
+
+def _bench_asr_transcribe():
+    from services.asr import ASRService
+    asr = ASRService(inference_processes=0)
+    with open(SAMPLE_AUDIO, "rb") as f:
+        audio = f.read()
+    return lambda: asr.transcribe(audio, "wav")
+
+
+def _bench_asr_post_process():
+    # _post_process_text 在调用时才导入 funasr，这里提前导入，缺少依赖时在 setup 阶段跳过
+    import funasr.utils.postprocess_utils  # noqa: F401
+    from services.asr import ASRService
+    # 后处理不依赖模型，跳过 __init__ 以免加载模型
+    asr = ASRService.__new__(ASRService)
+    return lambda: asr._post_process_text(ASR_RAW_TEXT)
+
+
+def _bench_tts_detect_language():
+    from services.tts import TTSService
+    tts = TTSService()
+    return lambda: [tts._detect_language(text) for text in TTS_TEXTS]
+
+
+def _bench_tts_clean_text():
+    from services.tts import TTSService
+    tts = TTSService()
+    return lambda: [tts._clean_text(text) for text in TTS_TEXTS]
+
+
+def _bench_dialogue_state_buffer():
+    from routers.ws import DialogueState
+    chunk = b"\x00" * 4096
+
+    def run():
+        state = DialogueState("bench")
+        for _ in range(50):
+            state.add_audio_chunk(chunk)
+        data = state.get_audio_data()
+        state.clear_audio_buffer()
+        return data
+    return run
+
+
+def _bench_dialogue_state_messages():
+    from routers.ws import DialogueState
+
+    def run():
+        state = DialogueState("bench")
+        for i in range(20):
+            state.add_message("user" if i % 2 == 0 else "assistant", TTS_TEXTS[i % len(TTS_TEXTS)])
+        return state.get_context()
+    return run
+
+
+def _bench_message_serialization():
+    messages = [
+        {"type": "transcription", "text": TTS_TEXTS[0]},
+        {"type": "response", "text": TTS_TEXTS[2] * 4},
+        {"type": "ping"},
+        {"type": "audio_end"},
+    ]
+    raw = [json.dumps(m) for m in messages]
+
+    def run():
+        for message in messages:
+            json.dumps(message)
+        for text in raw:
+            json.loads(text)
+    return run
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("ffmpeg.process_audio", _bench_ffmpeg_process_audio, requires="ffmpeg"),
+    Benchmark("ffmpeg.process_pcm", _bench_ffmpeg_process_pcm, requires="ffmpeg"),
+    Benchmark("asr.transcribe", _bench_asr_transcribe, requires="ffmpeg + ASR model"),
+    Benchmark("asr.post_process_text", _bench_asr_post_process, requires="funasr"),
+    Benchmark("tts.detect_language", _bench_tts_detect_language),
+    Benchmark("tts.clean_text", _bench_tts_clean_text),
+    Benchmark("dialogue_state.audio_buffer", _bench_dialogue_state_buffer),
+    Benchmark("dialogue_state.messages", _bench_dialogue_state_messages),
+    Benchmark("ws.message_serialization", _bench_message_serialization),
+]
+
+
+def measure(fn: Callable, loop: asyncio.AbstractEventLoop, min_time: float, repeat: int) -> Dict:
+    """自动确定迭代次数，返回每次调用耗时的统计（秒）"""
+    def call():
+        result = fn()
+        if asyncio.iscoroutine(result):
+            loop.run_until_complete(result)
+
+    # 预热并估算单次耗时
+    call()
+    start = time.perf_counter()
+    call()
+    single = max(time.perf_counter() - start, 1e-7)
+    iterations = max(1, int(min_time / single))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        samples.append((time.perf_counter() - start) / iterations)
+
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "iterations": iterations,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(name_filter: Optional[str], min_time: float, repeat: int) -> Dict:
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for bench in BENCHMARKS:
+            if name_filter and name_filter not in bench.name:
+                continue
+            try:
+                fn = bench.setup()
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                if bench.requires:
+                    reason = f"requires {bench.requires} ({reason})"
+                print(f"{bench.name:<32} skipped: {reason}")
+                continue
+            try:
+                result = measure(fn, loop, min_time, repeat)
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                if bench.requires:
+                    reason = f"requires {bench.requires} ({reason})"
+                print(f"{bench.name:<32} failed: {reason}")
+                continue
+            results[bench.name] = result
+            print(f"{bench.name:<32} {result['median_s'] * 1e6:>12.2f} us/op  (x{result['iterations']})")
+    finally:
+        loop.close()
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较，返回回归的基准名称"""
+    regressions = []
+    print(f"\n{'benchmark':<32}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<32}{'-':>14}{result['median_s'] * 1e6:>14.2f}{'new':>10}")
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] > 0 else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32}{base['median_s'] * 1e6:>14.2f}{result['median_s'] * 1e6:>14.2f}"
+              f"{(ratio - 1) * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="TianTian 微基准测试")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线 JSON 文件")
+    parser.add_argument("--save", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的相对退化比例")
+    parser.add_argument("--filter", dest="name_filter", help="只运行名称包含该字符串的基准")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮测量的最短时间（秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="测量轮数")
+    parser.add_argument("--json", dest="json_out", help="将本次结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.name_filter, args.min_time, args.repeat)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+            # 保留本次未运行（被过滤或跳过）的基准
+            merged = dict(previous.get("results", {}))
+            merged.update(results)
+            report["results"] = merged
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n基线已保存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n未找到基线 {args.baseline}，使用 --save 生成")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n性能回归（容忍度 {args.tolerance:.0%}）: {', '.join(regressions)}")
+        return 1
+    print(f"\n未发现超出 {args.tolerance:.0%} 的性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
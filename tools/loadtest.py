@@ -0,0 +1,264 @@
+"""
+端到端 WebSocket 压测工具
+
+打开 N 个并发 /ws/chat 会话，按配置的思考时间循环发送样例音频或文本轮次，
+统计吞吐量以及识别、回复、首个/最后一个音频分块的 p50/p95/p99 延迟。
+
+配合 --spawn-server 会同时启动本地 LLM/TTS 替身服务和一个服务端进程，完全离线运行:
+    python -m tools.loadtest --spawn-server --sessions 20 --turns 5 --text-only
+
+压测已有服务:
+    python -m tools.loadtest --url ws://127.0.0.1:8000/ws/chat --sessions 50 --turns 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import subprocess
+from typing import Dict, List, Optional
+import aiohttp
+
+from tools.standins import MockLLMServer, MockEdgeTTSServer
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_AUDIO = os.path.join("test", "sample", "sample-3s.wav")
+SAMPLE_TEXTS = ["你好", "今天天气怎么样？", "给我讲个笑话吧", "What time is it?", "谢谢，再见"]
+STAGES = ("transcription", "response", "first_audio", "last_audio")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LoadStats:
+    """压测统计"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.turns_ok = 0
+        self.turns_failed = 0
+        self.sessions_rejected = 0
+        self.turns_busy = 0
+        self.audio_bytes = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, stage: str, seconds: float):
+        self.latencies[stage].append(seconds)
+
+    def report(self) -> Dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        summary = {
+            "elapsed_s": round(elapsed, 3),
+            "turns_ok": self.turns_ok,
+            "turns_failed": self.turns_failed,
+            "turns_busy": self.turns_busy,
+            "sessions_rejected": self.sessions_rejected,
+            "throughput_turns_per_s": round(self.turns_ok / elapsed, 3) if elapsed > 0 else 0,
+            "audio_bytes_received": self.audio_bytes,
+            "latency_ms": {},
+        }
+        for stage, values in self.latencies.items():
+            summary["latency_ms"][stage] = {
+                "count": len(values),
+                "p50": round(percentile(values, 50) * 1000, 1),
+                "p95": round(percentile(values, 95) * 1000, 1),
+                "p99": round(percentile(values, 99) * 1000, 1),
+            }
+        return summary
+
+
+async def _run_turn(ws: aiohttp.ClientWebSocketResponse, payload, stats: LoadStats, timeout: float):
+    """发送一个轮次并等待 audio_end / error"""
+    start = time.perf_counter()
+    if isinstance(payload, bytes):
+        await ws.send_bytes(payload)
+    else:
+        await ws.send_str(json.dumps({"type": "text", "text": payload}))
+
+    first_audio = None
+    deadline = start + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            stats.turns_failed += 1
+            return
+        msg = await ws.receive(timeout=remaining)
+        now = time.perf_counter()
+        if msg.type == aiohttp.WSMsgType.BINARY:
+            stats.audio_bytes += len(msg.data)
+            if first_audio is None:
+                first_audio = now
+                stats.record("first_audio", now - start)
+            continue
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            stats.turns_failed += 1
+            return
+
+        data = json.loads(msg.data)
+        kind = data.get("type")
+        if kind == "ping":
+            await ws.send_str(json.dumps({"type": "pong"}))
+        elif kind == "transcription":
+            stats.record("transcription", now - start)
+            if not data.get("text", "").strip():
+                stats.turns_failed += 1
+                return
+        elif kind == "response":
+            stats.record("response", now - start)
+        elif kind == "audio_end":
+            stats.record("last_audio", now - start)
+            stats.turns_ok += 1
+            return
+        elif kind == "busy":
+            stats.turns_busy += 1
+            return
+        elif kind == "error":
+            stats.turns_failed += 1
+            return
+
+
+async def _run_session(args, audio: Optional[bytes], stats: LoadStats):
+    rng = random.Random()
+    # 错开建立连接的时间，避免同一时刻涌入
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+    async with aiohttp.ClientSession() as session:
+        try:
+            ws = await session.ws_connect(args.url, timeout=args.turn_timeout)
+        except Exception as e:
+            logger.warning(f"Connect failed: {e}")
+            stats.sessions_rejected += 1
+            return
+        async with ws:
+            msg = await ws.receive(timeout=args.turn_timeout)
+            if msg.type == aiohttp.WSMsgType.TEXT and json.loads(msg.data).get("type") == "busy":
+                stats.sessions_rejected += 1
+                return
+
+            for _ in range(args.turns):
+                if audio is not None and rng.random() >= args.text_ratio:
+                    payload = audio
+                else:
+                    payload = rng.choice(SAMPLE_TEXTS)
+                try:
+                    await _run_turn(ws, payload, stats, args.turn_timeout)
+                except (asyncio.TimeoutError, aiohttp.ClientError, ConnectionError):
+                    stats.turns_failed += 1
+                    return
+                if args.think_time > 0:
+                    await asyncio.sleep(rng.expovariate(1.0 / args.think_time))
+
+
+def _spawn_server(args, llm_url: str, tts_url: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "LLM_API_URL": llm_url,
+        "LLM_API_KEY": "local",
+        "TTS_ENDPOINT": tts_url,
+        "PORT": str(args.server_port),
+    })
+    cmd = [sys.executable, "main.py", "--port", str(args.server_port)]
+    if args.server_args:
+        cmd.extend(args.server_args.split())
+    return subprocess.Popen(cmd, env=env)
+
+
+async def _wait_for_server(url: str, timeout: float, capability: str = "audio"):
+    """等待服务端具备指定能力；只压测文本轮次时不必等待 ASR 模型加载"""
+    health = url.replace("ws://", "http://").split("/ws/")[0] + "/health/ready"
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            try:
+                async with session.get(health) as response:
+                    if response.status == 200:
+                        return
+                    snapshot = await response.json(content_type=None)
+                    if snapshot.get("capabilities", {}).get(capability):
+                        return
+            except (aiohttp.ClientError, ValueError):
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"服务端 {health} 未在 {timeout}s 内就绪")
+
+
+async def run(args) -> Dict:
+    audio = None
+    if not args.text_only:
+        with open(args.audio, "rb") as f:
+            audio = f.read()
+
+    llm = tts = server = None
+    try:
+        if args.spawn_server:
+            llm = MockLLMServer(latency=args.llm_latency)
+            tts = MockEdgeTTSServer(latency=args.tts_latency)
+            await llm.start()
+            await tts.start()
+            server = _spawn_server(args, llm.url, tts.url)
+            args.url = f"ws://127.0.0.1:{args.server_port}/ws/chat"
+            await _wait_for_server(args.url, args.startup_timeout, "text" if args.text_only else "audio")
+
+        stats = LoadStats()
+        await asyncio.gather(*[_run_session(args, audio, stats) for _ in range(args.sessions)])
+        stats.finished = time.perf_counter()
+        return stats.report()
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        if llm:
+            await llm.stop()
+        if tts:
+            await tts.stop()
+
+
+def print_report(report: Dict):
+    print(f"elapsed: {report['elapsed_s']}s  turns ok/failed/busy: "
+          f"{report['turns_ok']}/{report['turns_failed']}/{report['turns_busy']}  "
+          f"sessions rejected: {report['sessions_rejected']}")
+    print(f"throughput: {report['throughput_turns_per_s']} turns/s")
+    print(f"{'stage':<15}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, values in report["latency_ms"].items():
+        print(f"{stage:<15}{values['count']:>8}{values['p50']:>10}{values['p95']:>10}{values['p99']:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TianTian 端到端 WebSocket 压测")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws/chat", help="被测服务的 WebSocket 地址")
+    parser.add_argument("--sessions", type=int, default=10, help="并发会话数")
+    parser.add_argument("--turns", type=int, default=5, help="每个会话的轮次数")
+    parser.add_argument("--think-time", type=float, default=1.0, help="轮次间平均思考时间（秒，指数分布）")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="会话建立的错峰时间窗口（秒）")
+    parser.add_argument("--turn-timeout", type=float, default=60.0, help="单轮超时（秒）")
+    parser.add_argument("--audio", default=SAMPLE_AUDIO, help="回放的样例音频")
+    parser.add_argument("--text-ratio", type=float, default=0.5, help="文本轮次所占比例")
+    parser.add_argument("--text-only", action="store_true", help="只发送文本轮次（不依赖 ASR 模型）")
+    parser.add_argument("--json", dest="json_out", help="将结果写入 JSON 文件")
+    parser.add_argument("--spawn-server", action="store_true", help="启动本地替身服务与服务端进程")
+    parser.add_argument("--server-port", type=int, default=18000)
+    parser.add_argument("--server-args", default="", help="传给 main.py 的额外参数")
+    parser.add_argument("--startup-timeout", type=float, default=300.0, help="等待服务端就绪的时间（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="替身 LLM 延迟（秒）")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="替身 TTS 首包延迟（秒）")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
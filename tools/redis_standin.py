@@ -0,0 +1,132 @@
+"""
+本地 Redis 兼容替身服务
+
+仅实现会话存储用到的少量命令（PING/GET/SET/DEL/EXPIRE/TTL/CLIENT/SELECT），
+用于在没有 Redis 的环境中验证 RedisConversationStore 与多进程部署。
+
+用法:
+    python -m tools.redis_standin --port 6379
+"""
+import asyncio
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RedisStandIn:
+    """基于 asyncio 的极简 RESP2 服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        self.host = host
+        self.port = port
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Redis stand-in listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        item = self._data.get(key)
+        if not item:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # inline 命令
+            return line.strip().split()
+        count = int(line[1:].strip())
+        args = []
+        for _ in range(count):
+            header = await reader.readline()
+            length = int(header[1:].strip())
+            payload = await reader.readexactly(length + 2)
+            args.append(payload[:-2])
+        return args
+
+    def _execute(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command in (b"CLIENT", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            value = self._get(args[1])
+            if value is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            expires_at = None
+            options = [a.upper() for a in args[3:]]
+            if b"EX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"EX") + 1])
+            elif b"PX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            self._data[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = 0
+            for key in args[1:]:
+                if self._get(key) is not None:
+                    del self._data[key]
+                    removed += 1
+            return b":%d\r\n" % removed
+        if command == b"EXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return b":0\r\n"
+            self._data[args[1]] = (value, time.time() + int(args[2]))
+            return b":1\r\n"
+        if command == b"TTL":
+            if self._get(args[1]) is None:
+                return b":-2\r\n"
+            expires_at = self._data[args[1]][1]
+            return b":%d\r\n" % (-1 if expires_at is None else int(expires_at - time.time()))
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int):
+    server = RedisStandIn(host, port)
+    await server.start()
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 Redis 兼容替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args.host, args.port))
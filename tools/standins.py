@@ -0,0 +1,192 @@
+"""
+本地 LLM / TTS 替身服务
+
+- MockLLMServer: OpenAI 兼容的 /chat/completions 接口，按配置延迟返回固定长度回复
+- MockEdgeTTSServer: 说 Edge TTS WebSocket 协议的合成服务，按文本长度返回伪造的 MP3 数据
+
+配合 LLM_API_URL / TTS_ENDPOINT 环境变量即可让服务端完全离线运行，用于压测与回归。
+
+用法:
+    python -m tools.standins --llm-port 18001 --tts-port 18002
+"""
+import asyncio
+import argparse
+import json
+import logging
+import re
+import time
+import uuid
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+# 合法 MPEG 帧头，后面填充静音数据
+_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+class MockLLMServer:
+    """OpenAI 兼容的聊天补全替身"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, reply_chars: int = 60):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.reply_chars = reply_chars
+        self.requests = 0
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/chat/completions"
+
+    def _reply(self, messages) -> str:
+        last = messages[-1]["content"] if messages else ""
+        reply = f"收到：{last}。" + "这是本地替身服务生成的回复。" * 8
+        return reply[:self.reply_chars]
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        reply = self._reply(body.get("messages", []))
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            })
+
+        # 流式返回（SSE），每个分片几个字符
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(0, len(reply), 4):
+            chunk = {"choices": [{"index": 0, "delta": {"content": reply[i:i + 4]}}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", self._chat)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Mock LLM listening on {self.url}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class MockEdgeTTSServer:
+    """Edge TTS WebSocket 协议替身"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.1,
+                 bytes_per_char: int = 1500, chunk_size: int = 4096):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.bytes_per_char = bytes_per_char
+        self.chunk_size = chunk_size
+        self.connections = 0
+        self.requests = 0
+        self._runner = None
+        self._sockets = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/edge/v1?TrustedClientToken=local"
+
+    @staticmethod
+    def _headers(text: str) -> dict:
+        header_text = text.split("\r\n\r\n", 1)[0]
+        headers = {}
+        for line in header_text.split("\r\n"):
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key] = value
+        return headers
+
+    def _text_frame(self, request_id: str, path: str, body: str = "{}") -> str:
+        return (
+            f"X-RequestId:{request_id}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            f"Path:{path}\r\n\r\n{body}"
+        )
+
+    def _audio_frame(self, request_id: str, data: bytes) -> bytes:
+        header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode("utf-8")
+        return len(header).to_bytes(2, "big") + header + data
+
+    async def _synthesize(self, ws: web.WebSocketResponse, request_id: str, ssml: str):
+        self.requests += 1
+        text_len = max(1, len(re.sub(r"<[^>]+>", "", ssml)))
+        await asyncio.sleep(self.latency)
+        await ws.send_str(self._text_frame(request_id, "turn.start"))
+        total = text_len * self.bytes_per_char
+        audio = (_MP3_FRAME * (total // len(_MP3_FRAME) + 1))[:total]
+        for i in range(0, len(audio), self.chunk_size):
+            await ws.send_bytes(self._audio_frame(request_id, audio[i:i + self.chunk_size]))
+        await ws.send_str(self._text_frame(request_id, "turn.end"))
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                headers = self._headers(msg.data)
+                if headers.get("Path") == "ssml":
+                    body = msg.data.split("\r\n\r\n", 1)[1]
+                    await self._synthesize(ws, headers.get("X-RequestId", uuid.uuid4().hex), body)
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Mock Edge TTS listening on {self.url}")
+
+    async def stop(self):
+        # 像真实服务重启一样主动关闭保持中的连接，否则 cleanup 会等待它们超时
+        for ws in list(self._sockets):
+            await ws.close(code=1012)
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _serve(args):
+    llm = MockLLMServer(args.host, args.llm_port, latency=args.llm_latency)
+    tts = MockEdgeTTSServer(args.host, args.tts_port, latency=args.tts_latency)
+    await llm.start()
+    await tts.start()
+    print(f"LLM_API_URL={llm.url}")
+    print(f"TTS_ENDPOINT={tts.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 LLM / TTS 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--llm-port", type=int, default=18001)
+    parser.add_argument("--tts-port", type=int, default=18002)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="LLM 响应延迟（秒）")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="TTS 首包延迟（秒）")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args))
@@ -0,0 +1,274 @@
+"""
+离线批量转写工具
+
+遍历目录（或清单文件）中的音频，按批分发到进程池。每个工作进程只加载一次 ASR 模型
+（进程内推理），在内存中用 FFmpeg 解码后以 recognize_batch 批量识别，结果逐行写入 JSONL。
+已完成的文件记录在检查点文件中，中断后重新执行同一命令即可从断点继续；失败的文件写入单独的
+错误文件（默认 <output>.errors，每次运行重写），不写入结果与检查点，下次运行会重试。
+工作进程崩溃（如解码或推理导致进程被杀死）时报告未完成的批次并停止，修复后重新执行即可继续。
+进度以每墙钟小时处理的音频小时数报告。
+
+用法:
+    python -m tools.transcribe /data/calls --output calls.jsonl
+    python -m tools.transcribe --manifest files.txt --output out.jsonl --workers 16 --threads 2
+    python -m tools.transcribe /data/calls --output calls.jsonl --batch-size 16 --ext .wav --ext .mp3
+
+清单文件每行一个路径，或每行一个 JSON 对象（必须包含 path，其余字段原样写入结果）。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Set
+
+DEFAULT_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".opus", ".webm", ".flac", ".aac", ".amr")
+
+# 工作进程内的 ASR 服务，由 _init_worker 创建
+_asr = None
+
+
+def _init_worker(threads: int):
+    """工作进程初始化：限制推理线程数并加载一次模型"""
+    global _asr
+    from prefork import configure_worker_threads
+    from config.logging_setup import setup_logging
+    from services.asr import ASRService
+
+    setup_logging()
+    configure_worker_threads(threads)
+    _asr = ASRService(inference_processes=0)
+
+
+def _transcribe_batch(items: List[Dict]) -> List[Dict]:
+    """在工作进程中解码一批文件并批量识别，返回与输入一一对应的结果"""
+    from services.asr import pcm_to_float
+
+    bytes_per_second = _asr.ffmpeg.target_sr * _asr.ffmpeg.channels * _asr.ffmpeg.sample_width
+    results: List[Dict] = []
+    samples = []
+    for item in items:
+        result = dict(item)
+        start = time.perf_counter()
+        try:
+            with open(item["path"], "rb") as f:
+                pcm = _asr.ffmpeg.process_pcm(f.read())
+            result["audio_seconds"] = round(len(pcm) / bytes_per_second, 3)
+            result["_decode_s"] = time.perf_counter() - start
+            if pcm:
+                samples.append((len(results), pcm_to_float(pcm)))
+            else:
+                result["text"] = ""
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+
+    if samples:
+        start = time.perf_counter()
+        try:
+            texts = _asr.recognize_batch([s for _, s in samples])
+        except Exception:
+            # 整批失败时逐条识别，只让出错的文件失败
+            texts = []
+            for _, s in samples:
+                try:
+                    texts.append(_asr.recognize(s))
+                except Exception as e:
+                    texts.append(e)
+        per_file = (time.perf_counter() - start) / len(samples)
+        for (index, _), text in zip(samples, texts):
+            if isinstance(text, Exception):
+                results[index]["error"] = f"{type(text).__name__}: {text}"
+            else:
+                results[index]["text"] = text
+                results[index]["elapsed_ms"] = round((results[index]["_decode_s"] + per_file) * 1000, 1)
+
+    for result in results:
+        result.pop("_decode_s", None)
+    return results
+
+
+def collect_inputs(paths: Iterable[str], manifest: Optional[str], extensions: Iterable[str]) -> List[Dict]:
+    """展开目录与清单，返回按路径排序、去重后的待处理条目"""
+    extensions = tuple(e.lower() if e.startswith(".") else f".{e.lower()}" for e in extensions)
+    items: Dict[str, Dict] = {}
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if name.lower().endswith(extensions):
+                        full = os.path.join(root, name)
+                        items.setdefault(full, {"path": full})
+        elif os.path.isfile(path):
+            items.setdefault(path, {"path": path})
+        else:
+            print(f"跳过不存在的路径: {path}", file=sys.stderr)
+
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entry = json.loads(line) if line.startswith("{") else {"path": line}
+                items.setdefault(entry["path"], entry)
+
+    return [items[path] for path in sorted(items)]
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+class Progress:
+    """吞吐统计：音频小时 / 墙钟小时"""
+
+    def __init__(self, total: int, interval: float):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, result: Dict):
+        self.done += 1
+        if "error" in result:
+            self.failed += 1
+        self.audio_seconds += result.get("audio_seconds", 0.0)
+
+    def line(self) -> str:
+        wall = max(time.monotonic() - self.started, 1e-9)
+        speed = self.audio_seconds / wall
+        eta = (self.total - self.done) * wall / self.done if self.done else 0.0
+        return (f"[{self.done}/{self.total}] failed={self.failed} "
+                f"audio={self.audio_seconds / 3600:.2f}h wall={wall / 3600:.3f}h "
+                f"speed={speed:.1f} audio-h/wall-h eta={eta / 60:.1f}min")
+
+    def maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+
+def _describe_batch(index: int, batch: List[Dict]) -> str:
+    first, last = batch[0]["path"], batch[-1]["path"]
+    return f"批次 {index}（{len(batch)} 个文件）: {first}" + (f" ... {last}" if last != first else "")
+
+
+def run(items: List[Dict], output: str, checkpoint: str, errors: str, workers: int, threads: int,
+        batch_size: int, start_method: str, report_interval: float) -> int:
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    progress = Progress(len(items), report_interval)
+    # 每个工作进程保持两批在途，解码与识别之间不留空档
+    max_in_flight = workers * 2
+
+    with open(output, "a", encoding="utf-8") as out, open(checkpoint, "a", encoding="utf-8") as ckpt, \
+            open(errors, "w", encoding="utf-8") as err, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(start_method),
+                                initializer=_init_worker, initargs=(threads,)) as pool:
+        pending = {}
+        next_batch = 0
+        try:
+            while pending or next_batch < len(batches):
+                while next_batch < len(batches) and len(pending) < max_in_flight:
+                    pending[pool.submit(_transcribe_batch, batches[next_batch])] = next_batch
+                    next_batch += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                broken = []
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        broken.append(index)
+                        continue
+                    # 失败的文件只写入错误文件：重新运行时会重试，结果文件中不会出现重复的错误行
+                    for result in results:
+                        (err if "error" in result else out).write(json.dumps(result, ensure_ascii=False) + "\n")
+                        progress.update(result)
+                    # 先落盘结果再记录检查点，中断时最多重复处理，不会丢失结果
+                    out.flush()
+                    err.flush()
+                    for result in results:
+                        if "error" not in result:
+                            ckpt.write(result["path"] + "\n")
+                    ckpt.flush()
+                if broken:
+                    # 进程池损坏后所有在途批次都会失败，无法确定是哪一批导致崩溃
+                    unfinished = sorted(broken + list(pending.values()))
+                    print(progress.line(), file=sys.stderr)
+                    print("\n工作进程异常退出，以下批次未完成（其中之一可能包含导致崩溃的文件）:", file=sys.stderr)
+                    for index in unfinished:
+                        print(f"  {_describe_batch(index, batches[index])}", file=sys.stderr)
+                    print(f"已完成的文件已记录在检查点 {checkpoint}，重新执行同一命令即可继续"
+                          f"（可先用 --batch-size 1 定位出问题的文件）", file=sys.stderr)
+                    return 1
+                progress.maybe_report()
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print(progress.line(), file=sys.stderr)
+            print(f"\n已中断，重新执行同一命令即可从检查点 {checkpoint} 继续", file=sys.stderr)
+            return 130
+
+    if progress.failed:
+        print(f"{progress.failed} 个文件失败，详见 {errors}", file=sys.stderr)
+    print(f"完成 {progress.line()}", file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+def main(argv=None) -> int:
+    from config.settings import settings
+
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="TianTian 离线批量转写")
+    parser.add_argument("paths", nargs="*", help="音频文件或目录（递归）")
+    parser.add_argument("--manifest", help="清单文件：每行一个路径或一个 JSON 对象")
+    parser.add_argument("--output", required=True, help="结果 JSONL 文件（追加写入）")
+    parser.add_argument("--checkpoint", help="检查点文件，默认为 <output>.done")
+    parser.add_argument("--errors", help="失败文件列表（JSONL，每次运行重写），默认为 <output>.errors")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="工作进程数，默认 CPU 核数 / 每进程线程数")
+    parser.add_argument("--threads", type=int, default=1, help="每个工作进程的推理线程数")
+    parser.add_argument("--batch-size", type=int, default=8, help="每次批量识别的文件数")
+    parser.add_argument("--ext", action="append", dest="extensions",
+                        help=f"目录中要处理的扩展名（可重复），默认 {' '.join(DEFAULT_EXTENSIONS)}")
+    parser.add_argument("--start-method", default=settings.ASR_INFERENCE_START_METHOD,
+                        choices=mp.get_all_start_methods(), help="进程启动方式")
+    parser.add_argument("--report-interval", type=float, default=10, help="进度输出间隔（秒）")
+    args = parser.parse_args(argv)
+
+    if not args.paths and not args.manifest:
+        parser.error("需要指定音频路径或 --manifest")
+
+    checkpoint = args.checkpoint or f"{args.output}.done"
+    errors = args.errors or f"{args.output}.errors"
+    items = collect_inputs(args.paths, args.manifest, args.extensions or DEFAULT_EXTENSIONS)
+    completed = load_checkpoint(checkpoint)
+    todo = [item for item in items if item["path"] not in completed]
+    if not todo:
+        print(f"没有待处理的文件（共 {len(items)} 个，已完成 {len(items) - len(todo)} 个）", file=sys.stderr)
+        return 0
+
+    threads = max(1, args.threads)
+    workers = args.workers or max(1, cpus // threads)
+    workers = min(workers, (len(todo) + args.batch_size - 1) // args.batch_size)
+    print(f"待处理 {len(todo)} 个文件（跳过已完成 {len(items) - len(todo)} 个），"
+          f"{workers} 个进程 x {threads} 线程，批大小 {args.batch_size}", file=sys.stderr)
+
+    return run(todo, args.output, checkpoint, errors, workers, threads, args.batch_size,
+               args.start_method, args.report_interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())